@@ -5,12 +5,41 @@ Manejo de paquetes y procesamiento de mensajes
 
 import os
 import struct
+import time
 
 import config
+import network_core
 import protocol
 import threading
 import folder_utils
 
+# Cabeceras precalculadas para el envío de archivos.
+# Todos los fragmentos salvo el último miden exactamente config.CHUNK_SIZE,
+# así que su cabecera FILE_DATA es siempre idéntica; empaquetarla una sola
+# vez evita un struct.pack por fragmento. El paquete FILE_END no lleva
+# payload, por lo que es una constante completa.
+_FULL_CHUNK_HEADER = protocol.LinkChatHeader.pack(
+    protocol.PacketType.FILE_DATA, config.CHUNK_SIZE
+)
+_FILE_END_PACKET = protocol.LinkChatHeader.pack(protocol.PacketType.FILE_END, 0)
+
+
+def _decode_text(content: bytes) -> str:
+    """
+    Decodifica el contenido de un paquete de texto a string.
+
+    Los mensajes y nombres de usuario suelen ser ASCII puro; bytes.isascii()
+    es un chequeo en C muy barato que permite usar el decodificador ASCII
+    directo en ese caso, evitando la máquina de estados completa de UTF-8.
+
+    Raises:
+        UnicodeDecodeError: Si el contenido no es UTF-8 válido
+    """
+    if content.isascii():
+        return content.decode('ascii')
+    return content.decode('utf-8')
+
+
 class PacketHandler:
     """
     Manejador de paquetes para Link-Chat.
@@ -19,7 +48,22 @@ class PacketHandler:
     sus cabeceras y ejecuta las acciones apropiadas según el tipo de paquete
     (mensajes de texto, transferencia de archivos, etc.).
     """
-    
+
+    # Límite de transferencias de archivo simultáneas que se rastrean.
+    # Si un FILE_END se pierde, la entrada quedaría huérfana en el diccionario
+    # para siempre; con este límite el estado queda acotado en memoria.
+    MAX_ACTIVE_TRANSFERS = 64
+
+    # Tiempo (en segundos) sin recibir datos tras el cual una transferencia
+    # se considera abandonada y puede ser descartada.
+    TRANSFER_STALE_SECS = 120.0
+
+    # Cada cuántos fragmentos recibidos se imprime el progreso. Imprimir
+    # por fragmento domina el coste del camino de recepción a cualquier
+    # ritmo real de paquetes (print adquiere el candado de stdio y hace
+    # una syscall de escritura cada vez); una línea por lote basta.
+    PROGRESS_CHUNK_INTERVAL = 64
+
     def __init__(self):
         """
         Inicializa el manejador de paquetes.
@@ -56,7 +100,32 @@ class PacketHandler:
             username (str): Nombre de usuario local
         """
         self.username = username
-    
+
+    def _evict_stale_transfers(self):
+        """
+        Descarta transferencias abandonadas para acotar el uso de memoria.
+
+        Se eliminan las entradas sin actividad reciente y, si aún se supera
+        el límite, la transferencia más antigua. Los archivos a medio recibir
+        se cierran para no filtrar descriptores.
+        """
+        now = time.monotonic()
+        stale = [mac for mac, t in self.file_transfers.items()
+                 if now - t['last_activity'] > self.TRANSFER_STALE_SECS]
+
+        # Si incluso sin entradas caducadas se supera el límite, descartar la más antigua
+        if not stale and len(self.file_transfers) >= self.MAX_ACTIVE_TRANSFERS:
+            oldest = min(self.file_transfers, key=lambda m: self.file_transfers[m]['last_activity'])
+            stale.append(oldest)
+
+        for mac in stale:
+            transfer = self.file_transfers.pop(mac)
+            try:
+                transfer['file'].close()
+            except Exception:
+                pass
+            print(f"[Advertencia] Transferencia de '{transfer['filename']}' desde [{mac}] descartada por inactividad")
+
     def handle_packet(self, src_mac: str, payload: bytes):
         """
         Procesa un paquete recibido desde la red.
@@ -88,15 +157,19 @@ class PacketHandler:
         # Desempaquetar la cabecera para obtener tipo de paquete y longitud
         packet_type_value, payload_len = protocol.LinkChatHeader.unpack(header_bytes)
         
-        # Extraer el contenido real (después de la cabecera)
-        content = payload[protocol.LinkChatHeader.HEADER_SIZE:]
+        # Extraer el contenido real (después de la cabecera), recortado a
+        # la longitud que declara la propia cabecera: las tramas Ethernet
+        # cortas llegan rellenadas con ceros hasta 60 bytes y ese relleno
+        # NO forma parte del mensaje
+        content = payload[protocol.LinkChatHeader.HEADER_SIZE:
+                          protocol.LinkChatHeader.HEADER_SIZE + payload_len]
         
         # Procesar según el tipo de paquete
-        if packet_type_value == protocol.PacketType.TEXT.value:
+        if packet_type_value == protocol.PacketType.TEXT:
             # Es un mensaje de texto
             try:
                 # Decodificar los bytes a string UTF-8
-                message = content.decode('utf-8')
+                message = _decode_text(content)
                 
                 # Imprimir el mensaje formateado con la MAC de origen
                 print(f"Mensaje de [{src_mac}]: {message}")
@@ -104,7 +177,7 @@ class PacketHandler:
                 # Si falla la decodificación, ignorar el mensaje
                 print(f"[Advertencia] Mensaje corrupto recibido de [{src_mac}]")
         
-        elif packet_type_value == protocol.PacketType.FILE_START.value:
+        elif packet_type_value == protocol.PacketType.FILE_START:
             # Inicio de transferencia de archivo
             try:
                 # Desempaquetar el payload del FILE_START
@@ -129,16 +202,24 @@ class PacketHandler:
                     # Comportamiento original: prefijo "received_"
                     safe_filename = f"received_{filename}"
                 
-                # Abrir archivo para escritura binaria
-                file_object = open(safe_filename, 'wb')
-                
+                # Acotar el diccionario de transferencias antes de añadir una nueva
+                self._evict_stale_transfers()
+
+                # Abrir archivo para escritura binaria con un búfer grande
+                # (1 MB): los fragmentos se acumulan en memoria y llegan al
+                # disco en escrituras secuenciales grandes, en lugar de una
+                # syscall de escritura cada ~8 KB con el búfer por defecto
+                file_object = open(safe_filename, 'wb', buffering=1 << 20)
+
                 # Guardar información de la transferencia en el diccionario
                 self.file_transfers[src_mac] = {
                     'file': file_object,
                     'filename': filename,
                     'safe_filename': safe_filename,
                     'size': file_size,
-                    'received': 0
+                    'received': 0,
+                    'chunks': 0,
+                    'last_activity': time.monotonic()
                 }
                 
                 print(f"\n📥 Recibiendo archivo '{filename}' ({file_size} bytes) de [{src_mac}]...")
@@ -146,7 +227,7 @@ class PacketHandler:
             except Exception as e:
                 print(f"[Error] No se pudo iniciar recepción de archivo de [{src_mac}]: {e}")
         
-        elif packet_type_value == protocol.PacketType.FILE_DATA.value:
+        elif packet_type_value == protocol.PacketType.FILE_DATA:
             # Fragmento de datos del archivo
             try:
                 # Buscar la transferencia activa para este remitente
@@ -160,17 +241,23 @@ class PacketHandler:
                 # Escribir el fragmento de datos en el archivo
                 file_object.write(content)
                 
-                # Actualizar contador de bytes recibidos
+                # Actualizar contadores de bytes y fragmentos recibidos
                 transfer['received'] += len(content)
-                
-                # Mostrar progreso
-                progress = (transfer['received'] / transfer['size']) * 100 if transfer['size'] > 0 else 100
-                print(f"  Recibiendo... {transfer['received']}/{transfer['size']} bytes ({progress:.1f}%)")
+                transfer['chunks'] += 1
+                transfer['last_activity'] = time.monotonic()
+
+                # Mostrar progreso de forma espaciada: una línea cada
+                # PROGRESS_CHUNK_INTERVAL fragmentos o al completarse,
+                # no una por fragmento
+                if (transfer['chunks'] % self.PROGRESS_CHUNK_INTERVAL == 0
+                        or transfer['received'] >= transfer['size']):
+                    progress = (transfer['received'] / transfer['size']) * 100 if transfer['size'] > 0 else 100
+                    print(f"  Recibiendo... {transfer['received']}/{transfer['size']} bytes ({progress:.1f}%)")
             
             except Exception as e:
                 print(f"[Error] Error al escribir datos de archivo de [{src_mac}]: {e}")
         
-        elif packet_type_value == protocol.PacketType.FILE_END.value:
+        elif packet_type_value == protocol.PacketType.FILE_END:
             # Fin de transferencia de archivo
             try:
                 # Buscar la transferencia activa para este remitente
@@ -195,11 +282,11 @@ class PacketHandler:
             except Exception as e:
                 print(f"[Error] Error al finalizar recepción de archivo de [{src_mac}]: {e}")
         
-        elif packet_type_value == protocol.PacketType.DISCOVERY_REQUEST.value:
+        elif packet_type_value == protocol.PacketType.DISCOVERY_REQUEST:
             # Solicitud de descubrimiento recibida
             try:
                 # Decodificar el nombre de usuario del solicitante
-                requester_username = content.decode('utf-8')
+                requester_username = _decode_text(content)
                 
                 print(f"\n🔍 Solicitud de descubrimiento de '{requester_username}' [{src_mac}]")
                 
@@ -234,11 +321,11 @@ class PacketHandler:
             except Exception as e:
                 print(f"[Error] Error al procesar DISCOVERY_REQUEST de [{src_mac}]: {e}")
         
-        elif packet_type_value == protocol.PacketType.DISCOVERY_RESPONSE.value:
+        elif packet_type_value == protocol.PacketType.DISCOVERY_RESPONSE:
             # Respuesta de descubrimiento recibida
             try:
                 # Decodificar el nombre de usuario del que respondió
-                responder_username = content.decode('utf-8')
+                responder_username = _decode_text(content)
                 
                 # Mostrar usuario encontrado
                 print(f"👤 Usuario encontrado: '{responder_username}' en [{src_mac}]")
@@ -248,7 +335,7 @@ class PacketHandler:
             except Exception as e:
                 print(f"[Error] Error al procesar DISCOVERY_RESPONSE de [{src_mac}]: {e}")
         
-        elif packet_type_value == protocol.PacketType.FOLDER_START.value:
+        elif packet_type_value == protocol.PacketType.FOLDER_START:
             # Inicio de una carpeta
             try:
                 # Extraer longitud y ruta relativa
@@ -274,7 +361,7 @@ class PacketHandler:
             except Exception as e:
                 print(f"[Error] Error al procesar FOLDER_START de [{src_mac}]: {e}")
         
-        elif packet_type_value == protocol.PacketType.FOLDER_END.value:
+        elif packet_type_value == protocol.PacketType.FOLDER_END:
             # Fin de carpeta
             try:
                 if self._folder_stack:
@@ -299,173 +386,168 @@ class PacketHandler:
         2. FILE_DATA: Fragmentos de datos del archivo
         3. FILE_END: Señal de finalización
         """
+        self._stream_file(adapter, dest_mac, filepath,
+                          os.path.basename(filepath), standalone=True)
+
+    def _send_file_with_path(self, adapter, dest_mac: str, filepath: str, filename_for_header: str):
+        """
+        Versión interna de send_file que permite especificar el nombre en el header.
+        Usado para enviar archivos dentro de carpetas preservando la ruta relativa.
+
+        Args:
+            adapter: Instancia de NetworkAdapter
+            dest_mac (str): Dirección MAC destino
+            filepath (str): Ruta absoluta del archivo a enviar
+            filename_for_header (str): Nombre/ruta relativa a usar en el paquete FILE_START
+        """
+        self._stream_file(adapter, dest_mac, filepath, filename_for_header, standalone=False)
+
+    def _stream_file(self, adapter, dest_mac: str, filepath: str, header_name: str, standalone: bool):
+        """
+        Bucle único de envío de archivos, compartido por send_file y
+        _send_file_with_path.
+
+        Mantener un solo camino caliente garantiza que las optimizaciones del
+        bucle (cabecera precalculada, búfer fusionado cabecera+fragmento) se
+        apliquen una sola vez y no diverjan entre las dos variantes.
+
+        Args:
+            adapter: Instancia de NetworkAdapter
+            dest_mac (str): Dirección MAC destino
+            filepath (str): Ruta del archivo a enviar
+            header_name (str): Nombre/ruta relativa a anunciar en FILE_START
+            standalone (bool): True para el formato de progreso detallado de
+                               send_file; False para el formato compacto usado
+                               durante el envío de carpetas
+        """
         # Verificar que el archivo existe
         if not os.path.exists(filepath):
             print(f"[ERROR] El archivo '{filepath}' no existe.")
             return
-        
-        filename = os.path.basename(filepath)
-        
+
         try:
             file_size = os.path.getsize(filepath)
         except Exception as e:
             print(f"[ERROR] No se pudo obtener el tamaño de '{filepath}': {e}")
             return
-        
-        filename_bytes = filename.encode('utf-8')
-        filename_len = len(filename_bytes)
-        
+
+        filename_bytes = header_name.encode('utf-8')
+
         # Construir el payload para el paquete FILE_START
         # Estructura:
         # - 2 bytes: Longitud del nombre del archivo (!H = unsigned short)
         # - N bytes: Nombre del archivo en UTF-8
         # - 8 bytes: Tamaño total del archivo (!Q = unsigned long long)
-        
-        # Empaquetar la longitud del nombre del archivo (2 bytes)
-        filename_len_bytes = struct.pack('!H', filename_len)
-        
-        # Empaquetar el tamaño total del archivo (8 bytes)
-        file_size_bytes = struct.pack('!Q', file_size)
-        
-        # Construir el payload completo del FILE_START
-        file_start_payload = filename_len_bytes + filename_bytes + file_size_bytes
-        
-        # Crear la cabecera Link-Chat para FILE_START
+        file_start_payload = (struct.pack('!H', len(filename_bytes))
+                              + filename_bytes
+                              + struct.pack('!Q', file_size))
+
+        # Crear la cabecera Link-Chat para FILE_START y enviar el paquete
         file_start_header = protocol.LinkChatHeader.pack(
             protocol.PacketType.FILE_START,
             len(file_start_payload)
         )
-        
-        # Construir el paquete completo: cabecera + payload
-        file_start_packet = file_start_header + file_start_payload
-        
-        # Enviar el paquete FILE_START
-        adapter.send_frame(dest_mac, file_start_packet)
-        
-        print(f"✓ [FILE] FILE_START enviado: '{filename}' ({file_size} bytes) -> [{dest_mac}]")
-        
+        adapter.send_frame(dest_mac, file_start_header + file_start_payload)
+
+        if standalone:
+            print(f"✓ [FILE] FILE_START enviado: '{header_name}' ({file_size} bytes) -> [{dest_mac}]")
+        else:
+            print(f"  → FILE_START: {header_name} ({file_size} bytes)")
+
         try:
-            with open(filepath, 'rb') as file:
-                # Contador para seguimiento de progreso
-                bytes_sent = 0
-                chunk_count = 0
-                
-                # Leer y enviar el archivo en fragmentos
+            # Contadores para seguimiento de progreso
+            bytes_sent = 0
+            chunk_count = 0
+            header_size = protocol.LinkChatHeader.HEADER_SIZE
+
+            # Tamaño de fragmento negociado con el enlace: si la interfaz
+            # admite un MTU mayor que el estándar (jumbo frames), usar
+            # todo el espacio disponible reduce proporcionalmente el
+            # número de paquetes. El campo de longitud de la cabecera es
+            # de 16 bits, así que se limita a 65535.
+            chunk_size = config.CHUNK_SIZE
+            mtu = getattr(adapter, 'mtu', None)
+            if mtu and mtu - header_size > chunk_size:
+                chunk_size = min(mtu - header_size, 65535)
+
+            # Cabecera para fragmentos completos de este tamaño
+            if chunk_size == config.CHUNK_SIZE:
+                full_chunk_header = _FULL_CHUNK_HEADER
+            else:
+                full_chunk_header = protocol.LinkChatHeader.pack(
+                    protocol.PacketType.FILE_DATA, chunk_size)
+
+            # Lote de búferes de paquete reutilizables: cada uno contiene
+            # cabecera FILE_DATA + hueco para un fragmento. os.preadv()
+            # rellena los huecos de TODO el lote en una sola syscall de
+            # lectura (frente a un read() por fragmento), y los paquetes
+            # resultantes se entregan al kernel con una sola sendmmsg.
+            batch_bufs = [bytearray(header_size + chunk_size)
+                          for _ in range(network_core.MAX_BATCH)]
+            for buf in batch_bufs:
+                buf[:header_size] = full_chunk_header
+            packet_views = [memoryview(buf) for buf in batch_bufs]
+            data_views = [mv[header_size:] for mv in packet_views]
+
+            fd = os.open(filepath, os.O_RDONLY)
+            try:
+                offset = 0
                 while True:
-                    # Leer un fragmento del archivo del tamaño especificado en config.CHUNK_SIZE
-                    chunk = file.read(config.CHUNK_SIZE)
-                    
-                    # Si no hay más datos que leer, salir del bucle
-                    if not chunk:
+                    # Rellenar hasta MAX_BATCH fragmentos en una syscall
+                    n_read = os.preadv(fd, data_views, offset)
+                    if n_read == 0:
                         break
-                    
-                    # Incrementar contador de fragmentos
-                    chunk_count += 1
-                    bytes_sent += len(chunk)
-                    
-                    # Crear la cabecera Link-Chat para FILE_DATA
-                    file_data_header = protocol.LinkChatHeader.pack(
-                        protocol.PacketType.FILE_DATA,
-                        len(chunk)
-                    )
-                    
-                    # Construir el paquete completo: cabecera + fragmento de datos
-                    file_data_packet = file_data_header + chunk
-                    
-                    # Enviar el paquete FILE_DATA
-                    adapter.send_frame(dest_mac, file_data_packet)
-                    
-                    # Mostrar progreso
+                    offset += n_read
+                    bytes_sent += n_read
+
+                    # Fragmentos completos y resto del último búfer usado
+                    full_chunks, remainder = divmod(n_read, chunk_size)
+
+                    frames = [packet_views[i] for i in range(full_chunks)]
+                    if remainder:
+                        # El último fragmento es corto: reescribir su
+                        # cabecera in situ con la longitud real
+                        protocol.LinkChatHeader.pack_into(
+                            batch_bufs[full_chunks], 0,
+                            protocol.PacketType.FILE_DATA, remainder)
+                        frames.append(
+                            packet_views[full_chunks][:header_size + remainder])
+
+                    chunk_count += len(frames)
+                    adapter.send_frames_batch(dest_mac, frames)
+
+                    # Restaurar la cabecera precalculada si se modificó
+                    if remainder:
+                        batch_bufs[full_chunks][:header_size] = full_chunk_header
+
+                    # Mostrar progreso (una línea por lote enviado)
                     progress = (bytes_sent / file_size) * 100 if file_size > 0 else 100
-                    print(f"  [FILE] Enviando... {bytes_sent}/{file_size} bytes ({progress:.1f}%) - Fragmento #{chunk_count}")
-            
-            print(f"✓ [FILE] Archivo '{filename}' enviado completamente: {chunk_count} fragmentos, {bytes_sent} bytes")
-            
+                    if standalone:
+                        print(f"  [FILE] Enviando... {bytes_sent}/{file_size} bytes ({progress:.1f}%) - Fragmento #{chunk_count}")
+                    else:
+                        print(f"    Enviando... {bytes_sent}/{file_size} bytes ({progress:.1f}%)")
+            finally:
+                os.close(fd)
+
+            if standalone:
+                print(f"✓ [FILE] Archivo '{header_name}' enviado completamente: {chunk_count} fragmentos, {bytes_sent} bytes")
+
             # Enviar paquete FILE_END para notificar fin de transferencia
-            # Este paquete no tiene payload, solo la cabecera
-            file_end_header = protocol.LinkChatHeader.pack(
-                protocol.PacketType.FILE_END,
-                0  # Longitud del payload = 0 (sin datos adicionales)
-            )
-            
-            # Enviar el paquete FILE_END (solo cabecera)
-            adapter.send_frame(dest_mac, file_end_header)
-            
-            print(f"✓ [FILE] FILE_END enviado. Transferencia de '{filename}' completada.")
-        
+            # Este paquete no tiene payload, solo la cabecera (constante precalculada)
+            adapter.send_frame(dest_mac, _FILE_END_PACKET)
+
+            if standalone:
+                print(f"✓ [FILE] FILE_END enviado. Transferencia de '{header_name}' completada.")
+            else:
+                print(f"  → FILE_END: {header_name}")
+
         except PermissionError:
             print(f"[ERROR] Permisos insuficientes para leer el archivo '{filepath}'.")
         except OSError as e:
             print(f"[ERROR] Error de sistema al leer/enviar '{filepath}': {e}")
         except Exception as e:
             print(f"[ERROR] Error inesperado durante el envío de archivo '{filepath}': {e}")
-    
-    def _send_file_with_path(self, adapter, dest_mac: str, filepath: str, filename_for_header: str):
-        """
-        Versión interna de send_file que permite especificar el nombre en el header.
-        Usado para enviar archivos dentro de carpetas preservando la ruta relativa.
-        
-        Args:
-            adapter: Instancia de NetworkAdapter
-            dest_mac (str): Dirección MAC destino
-            filepath (str): Ruta absoluta del archivo a enviar
-            filename_for_header (str): Nombre/ruta relativa a usar en el paquete FILE_START
-        """
-        if not os.path.exists(filepath):
-            print(f"[ERROR] El archivo '{filepath}' no existe.")
-            return
-        
-        try:
-            file_size = os.path.getsize(filepath)
-        except Exception as e:
-            print(f"[ERROR] No se pudo obtener el tamaño de '{filepath}': {e}")
-            return
-        
-        # Usar filename_for_header en lugar de basename
-        filename_bytes = filename_for_header.encode('utf-8')
-        filename_len = len(filename_bytes)
-        
-        # Construir el payload para FILE_START
-        filename_len_bytes = struct.pack('!H', filename_len)
-        file_size_bytes = struct.pack('!Q', file_size)
-        file_start_payload = filename_len_bytes + filename_bytes + file_size_bytes
-        
-        # Crear y enviar cabecera FILE_START
-        file_start_header = protocol.LinkChatHeader.pack(protocol.PacketType.FILE_START, len(file_start_payload))
-        file_start_packet = file_start_header + file_start_payload
-        adapter.send_frame(dest_mac, file_start_packet)
-        
-        print(f"  → FILE_START: {filename_for_header} ({file_size} bytes)")
-        
-        # Enviar datos del archivo
-        try:
-            with open(filepath, 'rb') as file:
-                bytes_sent = 0
-                chunk_count = 0
-                
-                while True:
-                    chunk = file.read(config.CHUNK_SIZE)
-                    if not chunk:
-                        break
-                    
-                    chunk_count += 1
-                    bytes_sent += len(chunk)
-                    
-                    file_data_header = protocol.LinkChatHeader.pack(protocol.PacketType.FILE_DATA, len(chunk))
-                    file_data_packet = file_data_header + chunk
-                    adapter.send_frame(dest_mac, file_data_packet)
-                    
-                    progress = (bytes_sent / file_size) * 100 if file_size > 0 else 100
-                    print(f"    Enviando... {bytes_sent}/{file_size} bytes ({progress:.1f}%)")
-            
-            # FILE_END
-            file_end_header = protocol.LinkChatHeader.pack(protocol.PacketType.FILE_END, 0)
-            adapter.send_frame(dest_mac, file_end_header)
-            print(f"  → FILE_END: {filename_for_header}")
-            
-        except Exception as e:
-            print(f"[ERROR] Error al enviar '{filepath}': {e}")
-    
+
     def send_folder(self, adapter, dest_mac: str, folder_path: str):
         """
         Envía una carpeta completa (estructura y archivos) a través de la red.
@@ -13,9 +13,21 @@ ETHTYPE_CUSTOM = 0x1234
 # permite que todas las interfaces de red reciban el paquete
 BROADCAST_MAC = 'ff:ff:ff:ff:ff:ff'
 
-# Tamaño de los fragmentos de archivo en bytes para la transferencia
-# 1024 bytes (1 KB) es un tamaño óptimo que permite:
-# - Fragmentación eficiente de archivos grandes
-# - Evitar exceder el MTU (Maximum Transmission Unit) de Ethernet (1500 bytes)
-# - Balance entre eficiencia y manejo de errores
-CHUNK_SIZE = 1024
+# MTU estándar de Ethernet: máximo de bytes de datos por trama
+# (sin contar la cabecera Ethernet de 14 bytes)
+ETHERNET_MTU = 1500
+
+# Tamaño de la cabecera Ethernet: MAC destino (6) + MAC origen (6) + EtherType (2)
+ETHERNET_HEADER_SIZE = 14
+
+# Tamaño de la cabecera Link-Chat: tipo de paquete (1) + longitud (2).
+# Debe coincidir con protocol.LinkChatHeader.HEADER_SIZE (config no importa
+# protocol para mantenerse como módulo de constantes sin dependencias).
+LINKCHAT_HEADER_SIZE = 3
+
+# Tamaño de los fragmentos de archivo en bytes para la transferencia.
+# Se usa todo el espacio disponible en una trama Ethernet estándar:
+# 1500 (MTU) - 3 (cabecera Link-Chat) = 1497 bytes de datos por trama.
+# El valor anterior (1024) desperdiciaba ~32% de cada trama y obligaba a
+# enviar ~46% más paquetes (y syscalls) por archivo de los necesarios.
+CHUNK_SIZE = ETHERNET_MTU - LINKCHAT_HEADER_SIZE
@@ -3,8 +3,13 @@ Diagnóstico especializado para Link-Chat con cable Ethernet
 Detecta problemas específicos de comunicación entre dos laptops
 """
 
+import concurrent.futures
+import functools
+import io
+import os
 import socket
 import struct
+import threading
 import time
 import sys
 
@@ -12,6 +17,78 @@ import sys
 import config
 import utils
 import protocol
+import network_core
+
+
+@functools.lru_cache(maxsize=1)
+def _detected_interface():
+    """
+    Detecta la interfaz de red una sola vez y cachea el resultado.
+
+    Cada prueba del diagnóstico necesita la interfaz; sin la caché se
+    repetiría la enumeración de interfaces (syscalls) en cada una.
+    """
+    return utils.find_network_interface()
+
+
+@functools.lru_cache(maxsize=1)
+def _local_mac():
+    """Obtiene y cachea la dirección MAC local de la interfaz detectada."""
+    return utils.get_mac_address(_detected_interface())
+
+
+# Lectura de atributos sysfs compartida con main.py (ver utils)
+_read_sysfs = utils.read_interface_attr
+
+
+def _enlarge_socket_buffers(sock):
+    """
+    Amplía los búferes de envío/recepción del socket a 12 MB.
+
+    Con el tamaño por defecto (~208 KB) una ráfaga de tramas puede
+    descartarse en el kernel antes de que el script llegue a leerla. El
+    valor efectivo queda limitado por net.core.rmem_max / wmem_max.
+    """
+    for buf_opt in (socket.SO_RCVBUF, socket.SO_SNDBUF):
+        try:
+            sock.setsockopt(socket.SOL_SOCKET, buf_opt, 12 * 1024 * 1024)
+        except OSError:
+            pass
+
+
+class _ThreadLocalStdout:
+    """
+    Sustituto de sys.stdout que redirige cada hilo a su propio búfer.
+
+    Permite ejecutar varias pruebas del diagnóstico en paralelo sin que
+    sus print() se entremezclen: cada hilo registra un StringIO propio y
+    el hilo principal (sin búfer registrado) sigue escribiendo en el
+    stdout real. Al final, los búferes se vuelcan en orden.
+    """
+
+    def __init__(self, real_stdout):
+        self._real = real_stdout
+        self._local = threading.local()
+
+    def register(self, buffer):
+        """Asocia un búfer al hilo actual; sus print() irán ahí."""
+        self._local.buffer = buffer
+
+    def unregister(self):
+        """El hilo actual vuelve a escribir en el stdout real."""
+        self._local.buffer = None
+
+    def write(self, text):
+        buffer = getattr(self._local, 'buffer', None)
+        if buffer is not None:
+            buffer.write(text)
+        else:
+            self._real.write(text)
+
+    def flush(self):
+        buffer = getattr(self._local, 'buffer', None)
+        if buffer is None:
+            self._real.flush()
 
 
 class Colors:
@@ -28,9 +105,14 @@ class Colors:
 
 def print_header(text):
     """Imprime un encabezado formateado"""
-    print("\n" + "=" * 70)
-    print(f"{Colors.BOLD}{Colors.CYAN}{text:^70}{Colors.RESET}")
-    print("=" * 70 + "\n")
+    # Una sola llamada a write() en lugar de tres print(): un único
+    # bloqueo de stdio y una única syscall por encabezado
+    sys.stdout.write(
+        f"\n{'=' * 70}\n"
+        f"{Colors.BOLD}{Colors.CYAN}{text:^70}{Colors.RESET}\n"
+        f"{'=' * 70}\n\n"
+    )
+    sys.stdout.flush()
 
 
 def print_test(text):
@@ -63,7 +145,7 @@ def test_interface_cable_ethernet():
     print_header("1. VERIFICACIÓN DE INTERFAZ ETHERNET")
     
     try:
-        interface = utils.find_network_interface()
+        interface = _detected_interface()
         print_info(f"Interfaz detectada: {interface}")
         
         # Verificar si es WiFi
@@ -76,13 +158,11 @@ def test_interface_cable_ethernet():
             return False
         else:
             print_success(f"Interfaz Ethernet detectada: {interface}")
-            
-            # Verificar que esté UP
-            import subprocess
-            result = subprocess.run(['ip', 'link', 'show', interface], 
-                                  capture_output=True, text=True)
-            
-            if 'state UP' in result.stdout:
+
+            # Verificar que esté UP (leyendo sysfs, sin lanzar 'ip link show')
+            operstate = _read_sysfs(interface, 'operstate')
+
+            if operstate == 'up':
                 print_success("Interfaz está UP (activa)")
                 return True
             else:
@@ -100,24 +180,24 @@ def test_ethernet_link():
     print_header("2. VERIFICACIÓN DE ENLACE FÍSICO")
     
     try:
-        interface = utils.find_network_interface()
-        
-        import subprocess
-        result = subprocess.run(['ethtool', interface], 
-                              capture_output=True, text=True, 
-                              stderr=subprocess.DEVNULL)
-        
-        if result.returncode == 0:
-            if 'Link detected: yes' in result.stdout:
+        interface = _detected_interface()
+
+        # 'carrier' en sysfs equivale al 'Link detected' de ethtool,
+        # sin necesidad de lanzar el proceso externo
+        carrier = _read_sysfs(interface, 'carrier')
+
+        if carrier is not None:
+            if carrier == '1':
                 print_success("Cable ethernet conectado (link detectado)")
-                
-                # Obtener velocidad
-                for line in result.stdout.split('\n'):
-                    if 'Speed:' in line:
-                        print_info(f"  {line.strip()}")
-                    if 'Duplex:' in line:
-                        print_info(f"  {line.strip()}")
-                
+
+                # Obtener velocidad y dúplex (también desde sysfs)
+                speed = _read_sysfs(interface, 'speed')
+                duplex = _read_sysfs(interface, 'duplex')
+                if speed and speed != '-1':
+                    print_info(f"  Speed: {speed}Mb/s")
+                if duplex:
+                    print_info(f"  Duplex: {duplex.capitalize()}")
+
                 return True
             else:
                 print_error("Cable ethernet NO conectado")
@@ -127,10 +207,10 @@ def test_ethernet_link():
                 print_info("  3. Los puertos ethernet funcionan")
                 return False
         else:
-            print_warning("ethtool no disponible, saltando verificación de link")
-            print_info("Instala ethtool: sudo apt install ethtool")
+            print_warning("Estado de enlace no disponible, saltando verificación de link")
+            print_info("Puede que la interfaz esté DOWN o no exponga 'carrier' en sysfs")
             return True  # Asumimos que está bien
-    
+
     except Exception as e:
         print_warning(f"No se pudo verificar link físico: {e}")
         print_info("Continuando sin esta verificación...")
@@ -145,8 +225,8 @@ def test_send_receive_pattern():
     print_info("Sigue las instrucciones cuidadosamente\n")
     
     try:
-        interface = utils.find_network_interface()
-        src_mac = utils.get_mac_address()
+        interface = _detected_interface()
+        src_mac = _local_mac()
         
         print_info(f"Tu MAC: {src_mac}")
         print_info(f"Tu interfaz: {interface}\n")
@@ -164,7 +244,7 @@ def test_send_receive_pattern():
             
             dest_mac = input("\nIngresa la MAC de la otra laptop: ").strip()
             
-            if len(dest_mac) != 17 or dest_mac.count(':') != 5:
+            if not utils.is_valid_mac(dest_mac):
                 print_error("MAC inválida")
                 return False
             
@@ -172,7 +252,18 @@ def test_send_receive_pattern():
             sock = socket.socket(socket.AF_PACKET, socket.SOCK_RAW, 
                                socket.htons(config.ETHTYPE_CUSTOM))
             sock.bind((interface, 0))
-            
+            _enlarge_socket_buffers(sock)
+
+            # Camino de envío de baja latencia: fijar la interfaz a nivel
+            # de socket y saltar la capa de colas del kernel (best effort)
+            try:
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_BINDTODEVICE,
+                                interface.encode())
+                sock.setsockopt(network_core.SOL_PACKET,
+                                network_core.PACKET_QDISC_BYPASS, 1)
+            except OSError:
+                pass
+
             # Preparar mensaje
             test_message = f"ETHERNET_TEST_FROM_{src_mac}"
             message_bytes = test_message.encode('utf-8')
@@ -183,23 +274,31 @@ def test_send_receive_pattern():
             payload = header + message_bytes
             
             # Construir trama Ethernet
-            dest_mac_bytes = bytes.fromhex(dest_mac.replace(':', ''))
-            src_mac_bytes = bytes.fromhex(src_mac.replace(':', ''))
-            eth_header = struct.pack('!6s6sH', dest_mac_bytes, src_mac_bytes, 
+            dest_mac_bytes = utils.mac_str_to_bytes(dest_mac)
+            src_mac_bytes = utils.mac_str_to_bytes(src_mac)
+            eth_header = struct.pack('!6s6sH', dest_mac_bytes, src_mac_bytes,
                                     config.ETHTYPE_CUSTOM)
-            frame = eth_header + payload
-            
+
+            # Construir la trama una sola vez como bytearray mutable y
+            # reutilizar la misma memoryview en cada envío. Si más adelante
+            # se añade un campo variable (p.ej. contador de secuencia), se
+            # parchea in situ con struct.pack_into en vez de reconstruir
+            # cabecera + payload + concatenación por paquete.
+            frame = bytearray(eth_header)
+            frame += payload
+            frame_mv = memoryview(frame)
+
             print_info(f"\nEnviando mensaje de prueba...")
             print_info(f"  De: {src_mac}")
             print_info(f"  A: {dest_mac}")
             print_info(f"  Tamaño: {len(frame)} bytes")
-            
-            # Enviar 3 veces para asegurar
-            for i in range(3):
-                sock.send(frame)
-                print_success(f"Paquete #{i+1} enviado")
-                time.sleep(0.5)
-            
+
+            # Enviar 3 veces para asegurar. Las tres tramas se entregan al
+            # kernel en UNA sola llamada al sistema con sendmmsg(2) en vez
+            # de tres send() separados con pausas entre ellos.
+            sent = network_core.send_frames_batch(sock, [frame_mv] * 3)
+            print_success(f"{sent} paquetes enviados en una sola llamada (sendmmsg)")
+
             sock.close()
             
             print_success("\n✓ Envío completado")
@@ -214,46 +313,61 @@ def test_send_receive_pattern():
             sock = socket.socket(socket.AF_PACKET, socket.SOCK_RAW, 
                                socket.htons(config.ETHTYPE_CUSTOM))
             sock.bind((interface, 0))
+            _enlarge_socket_buffers(sock)
             sock.settimeout(30.0)
             
             print_info("\nEsperando mensajes por 30 segundos...")
             print_info("(En la otra laptop, ejecuta el modo EMISOR ahora)")
             print()
-            
+
             received_count = 0
             start_time = time.time()
-            
+
+            # Búfer de recepción preasignado: recv_into escribe cada trama
+            # aquí en lugar de que recvfrom(65535) asigne (y descarte) un
+            # bytes de 64 KB por paquete. Una trama Ethernet estándar cabe
+            # de sobra en 2 KB.
+            recv_buf = bytearray(2048)
+            recv_mv = memoryview(recv_buf)
+
             while time.time() - start_time < 30.0:
                 try:
-                    packet, addr = sock.recvfrom(65535)
-                    
-                    # Desempaquetar Ethernet
+                    n = sock.recv_into(recv_buf)
+                    packet = recv_mv[:n]
+
+                    # Desempaquetar la cabecera Ethernet sin crear cortes
+                    # intermedios: unpack_from lee directamente del búfer
+                    # recibido y memoryview da acceso a cabecera y contenido
+                    # sin copiar los bytes del payload
                     eth_header_size = 14
-                    eth_header = packet[:eth_header_size]
-                    dest_mac_bytes, src_mac_bytes, ethertype = struct.unpack(
-                        '!6s6sH', eth_header)
-                    
-                    src_mac_recv = ':'.join(f'{b:02x}' for b in src_mac_bytes)
-                    
+                    dest_mac_bytes, src_mac_bytes, ethertype = struct.unpack_from(
+                        '!6s6sH', packet, 0)
+
+                    # bytes.hex(':') produce 'aa:bb:cc:dd:ee:ff' en una sola
+                    # llamada en C, sin generador ni 6 f-strings por paquete
+                    src_mac_recv = src_mac_bytes.hex(':')
+
                     # Verificar EtherType
                     if ethertype == config.ETHTYPE_CUSTOM:
                         received_count += 1
-                        
-                        # Extraer payload
-                        payload = packet[eth_header_size:]
-                        
-                        if len(payload) >= protocol.LinkChatHeader.HEADER_SIZE:
-                            header_bytes = payload[:protocol.LinkChatHeader.HEADER_SIZE]
-                            pkt_type, payload_len = protocol.LinkChatHeader.unpack(header_bytes)
-                            content = payload[protocol.LinkChatHeader.HEADER_SIZE:]
-                            
+
+                        # Vista sin copia sobre el payload
+                        mv = memoryview(packet)
+                        header_size = protocol.LinkChatHeader.HEADER_SIZE
+                        payload_size = len(packet) - eth_header_size
+
+                        if payload_size >= header_size:
+                            pkt_type, payload_len = protocol.LinkChatHeader.unpack(
+                                mv[eth_header_size:eth_header_size + header_size])
+                            content = mv[eth_header_size + header_size:]
+
                             try:
-                                message = content.decode('utf-8')
+                                message = str(content, 'utf-8')
                                 print_success(f"✓ Mensaje recibido de [{src_mac_recv}]:")
                                 print_info(f"  Contenido: {message}")
                             except:
-                                print_success(f"✓ Paquete recibido de [{src_mac_recv}] ({len(payload)} bytes)")
-                
+                                print_success(f"✓ Paquete recibido de [{src_mac_recv}] ({payload_size} bytes)")
+
                 except socket.timeout:
                     break
             
@@ -325,30 +439,26 @@ def test_arp_table():
     print_header("5. TABLA ARP (Dispositivos descubiertos)")
     
     try:
-        interface = utils.find_network_interface()
-        
-        import subprocess
-        result = subprocess.run(['arp', '-i', interface, '-n'], 
-                              capture_output=True, text=True)
-        
-        if result.returncode == 0 and result.stdout:
+        interface = _detected_interface()
+
+        # Una sola lectura de /proc/net/arp (vía utils.load_arp_table) da
+        # la misma tabla que muestra 'arp -n', sin el coste de lanzar el
+        # proceso externo, y ya filtrada por interfaz y sin entradas
+        # incompletas.
+        arp_table = utils.load_arp_table(interface)
+
+        if arp_table:
             print_info("Dispositivos en la red local:")
-            print(result.stdout)
-            
-            lines = result.stdout.split('\n')
-            device_count = len([l for l in lines if l and not l.startswith('Address')])
-            
-            if device_count > 0:
-                print_success(f"Se encontraron {device_count} dispositivos")
-                return True
-            else:
-                print_warning("No se encontraron otros dispositivos")
-                print_info("Esto es normal si las laptops no han intercambiado tráfico IP")
-                return True
+            for ip, mac in arp_table.items():
+                print(f"  {ip:<18} {mac}  ({interface})")
+
+            print_success(f"Se encontraron {len(arp_table)} dispositivos")
+            return True
         else:
-            print_info("Tabla ARP vacía o no disponible")
+            print_warning("No se encontraron otros dispositivos")
+            print_info("Esto es normal si las laptops no han intercambiado tráfico IP")
             return True
-    
+
     except Exception as e:
         print_warning(f"No se pudo obtener tabla ARP: {e}")
         return True
@@ -356,34 +466,67 @@ def test_arp_table():
 
 def main():
     """Ejecuta diagnóstico completo para Ethernet"""
-    print(Colors.BOLD + Colors.CYAN)
-    print("=" * 70)
-    print("  DIAGNÓSTICO ETHERNET - LINK-CHAT")
-    print("  Cable directo entre dos laptops")
-    print("=" * 70)
-    print(Colors.RESET)
-    
-    # Verificar permisos
+    # Verificar permisos ANTES de cualquier otra cosa: si no somos root
+    # ninguna prueba puede funcionar, así que se falla de inmediato sin
+    # imprimir cabeceras ni lanzar procesos
     if os.geteuid() != 0:
         print_error("Este script requiere permisos de root")
         print_info("Ejecuta con: sudo python3 ethernet_diagnostic.py")
         sys.exit(1)
-    
+
+    # Banner en una sola escritura (ver print_header)
+    sys.stdout.write(
+        f"{Colors.BOLD}{Colors.CYAN}\n"
+        f"{'=' * 70}\n"
+        f"  DIAGNÓSTICO ETHERNET - LINK-CHAT\n"
+        f"  Cable directo entre dos laptops\n"
+        f"{'=' * 70}\n"
+        f"{Colors.RESET}\n"
+    )
+    sys.stdout.flush()
+
     results = []
-    
-    # Test 1: Verificar interfaz Ethernet
-    results.append(("Interfaz Ethernet", test_interface_cable_ethernet()))
-    
-    # Test 2: Verificar link físico
-    results.append(("Enlace físico", test_ethernet_link()))
-    
-    # Test 3: Verificar firewall
-    results.append(("Firewall", test_firewall()))
-    
-    # Test 4: Tabla ARP
-    results.append(("Tabla ARP", test_arp_table()))
-    
-    # Test 5: Prueba de envío/recepción
+
+    # Tests 1-4 son independientes y de solo lectura (sysfs, /proc, un
+    # subprocess): se ejecutan EN PARALELO y el tiempo total pasa a ser
+    # el de la prueba más lenta en vez de la suma de las cuatro. Cada
+    # hilo escribe en su propio búfer y la salida se imprime en orden.
+    non_interactive_tests = [
+        ("Interfaz Ethernet", test_interface_cable_ethernet),
+        ("Enlace físico", test_ethernet_link),
+        ("Firewall", test_firewall),
+        ("Tabla ARP", test_arp_table),
+    ]
+
+    dispatcher = _ThreadLocalStdout(sys.stdout)
+
+    def _run_captured(test_fn):
+        """Ejecuta una prueba con su salida capturada en un búfer propio."""
+        buffer = io.StringIO()
+        dispatcher.register(buffer)
+        try:
+            passed = test_fn()
+        finally:
+            dispatcher.unregister()
+        return passed, buffer.getvalue()
+
+    original_stdout = sys.stdout
+    sys.stdout = dispatcher
+    try:
+        with concurrent.futures.ThreadPoolExecutor(
+                max_workers=len(non_interactive_tests)) as executor:
+            futures = [executor.submit(_run_captured, test_fn)
+                       for _, test_fn in non_interactive_tests]
+            for (name, _), future in zip(non_interactive_tests, futures):
+                passed, output = future.result()
+                # El hilo principal no tiene búfer: escribe al stdout real
+                sys.stdout.write(output)
+                results.append((name, passed))
+    finally:
+        sys.stdout = original_stdout
+
+    # Test 5 es interactivo (pide rol y coordina con la otra laptop):
+    # se mantiene secuencial y con el stdout normal
     results.append(("Envío/Recepción", test_send_receive_pattern()))
     
     # Resumen
@@ -412,5 +555,4 @@ def main():
 
 
 if __name__ == "__main__":
-    import os
     main()
\ No newline at end of file
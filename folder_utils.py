@@ -19,46 +19,71 @@ from typing import Generator, Tuple
 
 def walk_folder(folder_path: str, base_path: str = None) -> Generator[Tuple[str, str], None, None]:
     """
-    Recorre recursivamente una carpeta, generando eventos ordenados para envío.
-    
+    Recorre una carpeta, generando eventos ordenados para envío.
+
     Args:
         folder_path (str): Ruta absoluta o relativa de la carpeta a recorrer.
         base_path (str, opcional): Ruta base para calcular rutas relativas. Si es None, se usa folder_path.
-    
+
     Yields:
         tuple: (evento, ruta_relativa)
             - evento: 'FOLDER_START', 'FILE', 'FOLDER_END'
             - ruta_relativa: Ruta relativa respecto a base_path
-    
+
     Ejemplo de uso:
         for event, relpath in walk_folder('mi_carpeta'):
             print(event, relpath)
     """
-    if base_path is None:
-        base_path = os.path.abspath(folder_path)
-    
     folder_path = os.path.abspath(folder_path)
+    if base_path is None:
+        base_path = folder_path
+
     rel_folder = os.path.relpath(folder_path, base_path)
     if rel_folder == '.':
         rel_folder = ''
-    
-    # Evento de inicio de carpeta
-    yield ('FOLDER_START', rel_folder)
-    
-    # Listar contenido ordenado: carpetas primero, luego archivos (alfabéticamente)
-    entries = sorted(os.listdir(folder_path))
-    dirs = [e for e in entries if os.path.isdir(os.path.join(folder_path, e))]
-    files = [e for e in entries if os.path.isfile(os.path.join(folder_path, e))]
-    
-    # Archivos
-    for fname in files:
-        rel_file = os.path.join(rel_folder, fname) if rel_folder else fname
-        yield ('FILE', rel_file)
-    
-    # Subcarpetas (recursivo)
-    for dname in dirs:
-        subfolder = os.path.join(folder_path, dname)
-        yield from walk_folder(subfolder, base_path)
-    
-    # Evento de fin de carpeta
-    yield ('FOLDER_END', rel_folder)
+
+    # Pila explícita de trabajo en lugar de recursión: evita el coste de un
+    # frame de Python por nivel de anidamiento en árboles muy profundos.
+    # Cada elemento es ('ENTER', ruta_absoluta, ruta_relativa) para procesar
+    # una carpeta, o ('EXIT', None, ruta_relativa) para emitir su cierre.
+    stack = [('ENTER', folder_path, rel_folder)]
+
+    while stack:
+        action, path, rel = stack.pop()
+
+        if action == 'EXIT':
+            # Evento de fin de carpeta (todas sus subcarpetas ya procesadas)
+            yield ('FOLDER_END', rel)
+            continue
+
+        # Evento de inicio de carpeta
+        yield ('FOLDER_START', rel)
+
+        # Un único scandir por carpeta: DirEntry trae el tipo de entrada
+        # cacheado (d_type), evitando el par isdir/isfile —dos stat() por
+        # entrada— que hacía la versión basada en os.listdir.
+        # Se particiona en UNA pasada sobre el iterador, sin materializar
+        # la lista completa de entradas, y solo se ordenan las dos listas
+        # resultantes (más pequeñas que el total en carpetas mixtas).
+        files = []
+        dirs = []
+        with os.scandir(path) as it:
+            for entry in it:
+                if entry.is_file(follow_symlinks=False):
+                    files.append(entry.name)
+                elif entry.is_dir(follow_symlinks=False):
+                    dirs.append(entry.name)
+        files.sort()
+        dirs.sort()
+
+        # Archivos (alfabéticamente)
+        for fname in files:
+            yield ('FILE', os.path.join(rel, fname) if rel else fname)
+
+        # Apilar primero el cierre de esta carpeta y después las subcarpetas
+        # en orden inverso: al ser LIFO se procesan alfabéticamente y el
+        # FOLDER_END del padre sale solo cuando todas han terminado
+        stack.append(('EXIT', None, rel))
+        for dname in reversed(dirs):
+            sub_rel = os.path.join(rel, dname) if rel else dname
+            stack.append(('ENTER', os.path.join(path, dname), sub_rel))
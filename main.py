@@ -8,6 +8,8 @@ import utils
 import network_core
 import protocol
 from app_logic import PacketHandler
+import queue
+import selectors
 import subprocess
 import sys
 import os
@@ -27,6 +29,33 @@ def run_command(cmd, check=False):
         return None
 
 
+def _ip_batch(cmds):
+    """
+    Ejecuta varias órdenes de 'ip' en UN solo proceso con 'ip -batch -'.
+
+    'ip -batch -' lee una orden por línea desde stdin y las ejecuta todas
+    en el mismo proceso: un único fork+exec en lugar de uno por consulta.
+
+    Args:
+        cmds (list): Órdenes de ip sin el prefijo 'ip' (ej: ['link show eth0'])
+
+    Returns:
+        str: Salida combinada de todas las órdenes, o None si 'ip' falla
+    """
+    try:
+        process = subprocess.Popen(
+            ['ip', '-batch', '-'],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True
+        )
+        output, _ = process.communicate('\n'.join(cmds) + '\n')
+        return output
+    except OSError:
+        return None
+
+
 def find_and_setup_ethernet():
     """
     Encuentra y configura automáticamente una interfaz Ethernet.
@@ -75,45 +104,46 @@ def find_and_setup_ethernet():
     
     # Verificar y activar la interfaz si está DOWN
     print(f"\n🔧 Configurando interfaz: {target_interface}")
-    
-    status_output = run_command(f"ip link show {target_interface}")
-    
-    if status_output and 'state DOWN' in status_output:
+
+    # Estado del enlace leído de sysfs: un open+read en lugar de lanzar
+    # 'ip link show' y buscar 'state UP/DOWN' en su salida de texto
+    operstate = utils.read_interface_attr(target_interface, 'operstate')
+
+    if operstate == 'down':
         print(f"  └─ Interfaz está DOWN, activando...")
-        run_command(f"ip link set {target_interface} up")
-        
+        _ip_batch([f"link set {target_interface} up"])
+
         time.sleep(2)
-        
+
         # Verificar nuevamente
-        status_output = run_command(f"ip link show {target_interface}")
-        if status_output and 'state UP' in status_output:
+        if utils.read_interface_attr(target_interface, 'operstate') == 'up':
             print(f"  └─ ✓ Interfaz activada correctamente")
         else:
             warnings.append(f"⚠ No se pudo activar la interfaz {target_interface}")
-    elif status_output and 'state UP' in status_output:
+    elif operstate == 'up':
         print(f"  └─ ✓ Interfaz ya está activa")
-    
-    # Si es Ethernet, verificar link físico
+
+    # Si es Ethernet, verificar link físico (sysfs 'carrier' y 'speed'
+    # equivalen al 'Link detected'/'Speed' de ethtool, sin el proceso externo)
     if is_ethernet:
-        link_output = run_command(f"ethtool {target_interface}")
-        if link_output:
-            if 'Link detected: yes' in link_output:
-                print(f"  └─ ✓ Cable Ethernet conectado")
-                
-                # Mostrar velocidad si está disponible
-                for line in link_output.split('\n'):
-                    if 'Speed:' in line:
-                        speed = line.split(':')[1].strip()
-                        print(f"      └─ Velocidad: {speed}")
-                        break
-            elif 'Link detected: no' in link_output:
-                warnings.append("⚠ ADVERTENCIA: Cable Ethernet desconectado")
-                warnings.append("  Verifica que el cable esté bien conectado")
+        carrier = utils.read_interface_attr(target_interface, 'carrier')
+        if carrier == '1':
+            print(f"  └─ ✓ Cable Ethernet conectado")
+
+            # Mostrar velocidad si está disponible
+            speed = utils.read_interface_attr(target_interface, 'speed')
+            if speed and speed != '-1':
+                print(f"      └─ Velocidad: {speed}Mb/s")
+        elif carrier == '0':
+            warnings.append("⚠ ADVERTENCIA: Cable Ethernet desconectado")
+            warnings.append("  Verifica que el cable esté bien conectado")
     
-    # Verificar si tiene IP configurada (solo informativo, NO es necesario para Capa 2)
-    addr_output = run_command(f"ip addr show {target_interface}")
+    # Verificar si tiene IP configurada (solo informativo, NO es necesario
+    # para Capa 2). Las direcciones no están en sysfs: única consulta
+    # que sigue necesitando 'ip', a través del helper batch.
+    addr_output = _ip_batch([f"addr show {target_interface}"])
     has_ip = addr_output and 'inet ' in addr_output
-    
+
     if has_ip:
         print(f"  └─ ℹ️  Interfaz tiene IP configurada (no necesario para Link-Chat)")
     else:
@@ -177,7 +207,23 @@ def main():
         
         # 5. Inicio del Hilo Listener
         # ===========================
-        network_core.start_listener_thread(adapter, packet_handler.handle_packet)
+        # El hilo listener NO procesa ni imprime: solo encola el paquete
+        # y despierta al bucle principal escribiendo un byte en una
+        # tubería. Así todo el procesamiento y la salida por pantalla
+        # ocurren en el hilo principal, sin líneas entremezcladas ni
+        # contención del GIL entre la interfaz y la recepción.
+        rx_queue = queue.SimpleQueue()
+        rx_wakeup_r, rx_wakeup_w = os.pipe()
+        os.set_blocking(rx_wakeup_r, False)
+
+        def on_packet(src_mac, payload):
+            rx_queue.put((src_mac, payload))
+            try:
+                os.write(rx_wakeup_w, b'\x01')
+            except OSError:
+                pass
+
+        network_core.start_listener_thread(adapter, on_packet)
         print("  └─ Escuchando en segundo plano...")
         
         # 6. Configuración del nombre de usuario
@@ -197,107 +243,179 @@ def main():
         
         # 7. Bucle Principal de Comandos
         # ==============================
+        # Cada comando es una función y el bucle los despacha con UNA
+        # búsqueda en diccionario, en lugar de recorrer una cadena de
+        # elif comparando cadena a cadena en cada línea introducida.
+
+        # Paquete de descubrimiento precalculado: es siempre idéntico
+        # (cabecera DISCOVERY_REQUEST sin payload), así que se construye
+        # una sola vez al arrancar — esto además valida el formato antes
+        # de que el usuario escriba el primer comando
+        discovery_packet = protocol.LinkChatHeader.pack(
+            protocol.PacketType.DISCOVERY_REQUEST, 0)
+
+        def do_help(parts):
+            print("\nComandos disponibles:")
+            print("  send <MAC_destino> <mensaje>   - Envía un mensaje a una MAC específica")
+            print("  broadcast <mensaje>            - Envía un mensaje a todos en la red")
+            print("  file <MAC_destino> <ruta_archivo> - Envía un archivo a una MAC")
+            print("  folder <MAC_destino> <ruta_carpeta> - Envía una carpeta a una MAC")
+            print("  discover                       - Busca otros usuarios en la red")
+            print("  exit                           - Cierra la aplicación")
+
+        def do_send(parts):
+            if len(parts) < 3:
+                print("❌ Uso: send <MAC_destino> <mensaje>")
+                return
+
+            dest_mac = parts[1]
+            if not utils.is_valid_mac(dest_mac):
+                print(f"❌ Error: MAC destino inválida: '{dest_mac}'")
+                return
+            message = ' '.join(parts[2:])
+
+            # Crear cabecera y payload
+            payload = message.encode('utf-8')
+            header = protocol.LinkChatHeader.pack(protocol.PacketType.TEXT, len(payload))
+
+            # Enviar trama
+            print(f"-> Enviando a {dest_mac}...")
+            adapter.send_frame(dest_mac, header + payload)
+
+        def do_broadcast(parts):
+            if len(parts) < 2:
+                print("❌ Uso: broadcast <mensaje>")
+                return
+
+            message = ' '.join(parts[1:])
+
+            # Crear cabecera y payload
+            payload = message.encode('utf-8')
+            header = protocol.LinkChatHeader.pack(protocol.PacketType.TEXT, len(payload))
+
+            # Enviar trama a la dirección de broadcast
+            print("-> Enviando a todos (broadcast)...")
+            adapter.send_frame(config.BROADCAST_MAC, header + payload)
+
+        def do_file(parts):
+            if len(parts) != 3:
+                print("❌ Uso: file <MAC_destino> <ruta_archivo>")
+                return
+            dest_mac = parts[1]
+            filepath = parts[2]
+            if not utils.is_valid_mac(dest_mac):
+                print(f"❌ Error: MAC destino inválida: '{dest_mac}'")
+                return
+            if not os.path.exists(filepath):
+                print(f"❌ Error: El archivo '{filepath}' no existe.")
+                return
+            # Iniciar transferencia de archivo (se ejecuta en segundo plano)
+            thread = threading.Thread(target=packet_handler.send_file, args=(adapter, dest_mac, filepath))
+            thread.start()
+
+        def do_folder(parts):
+            if len(parts) != 3:
+                print("❌ Uso: folder <MAC_destino> <ruta_carpeta>")
+                return
+            dest_mac = parts[1]
+            folder_path = parts[2]
+            if not utils.is_valid_mac(dest_mac):
+                print(f"❌ Error: MAC destino inválida: '{dest_mac}'")
+                return
+            if not os.path.exists(folder_path):
+                print(f"❌ Error: La ruta '{folder_path}' no existe.")
+                return
+            if not os.path.isdir(folder_path):
+                print(f"❌ Error: '{folder_path}' no es una carpeta.")
+                return
+            # Iniciar transferencia de carpeta (en segundo plano)
+            thread = threading.Thread(target=packet_handler.send_folder, args=(adapter, dest_mac, folder_path))
+            thread.start()
+
+        def do_discover(parts):
+            # Enviar el paquete de descubrimiento precalculado a broadcast
+            print("-> Buscando otros usuarios en la red...")
+            adapter.send_frame(config.BROADCAST_MAC, discovery_packet)
+
+        cmd_table = {
+            'help': do_help,
+            'send': do_send,
+            'broadcast': do_broadcast,
+            'file': do_file,
+            'folder': do_folder,
+            'discover': do_discover,
+        }
+
         print("\n✅ Sistema listo. Escribe 'help' para ver los comandos.")
-        
-        while True:
+
+        def _drain_rx():
+            """Procesa en el hilo principal todos los paquetes encolados."""
             try:
-                # Leer comando del usuario
-                user_input = input(f"[{username}]> ").strip()
-                
-                if not user_input:
-                    continue
-                
-                parts = user_input.split()
-                command = parts[0].lower()
-                
-                # Procesar comandos
-                if command == "exit":
+                while True:
+                    os.read(rx_wakeup_r, 4096)
+            except BlockingIOError:
+                pass
+            while True:
+                try:
+                    src_mac, payload = rx_queue.get_nowait()
+                except queue.Empty:
                     break
-                
-                elif command == "help":
-                    print("\nComandos disponibles:")
-                    print("  send <MAC_destino> <mensaje>   - Envía un mensaje a una MAC específica")
-                    print("  broadcast <mensaje>            - Envía un mensaje a todos en la red")
-                    print("  file <MAC_destino> <ruta_archivo> - Envía un archivo a una MAC")
-                    print("  discover                       - Busca otros usuarios en la red")
-                    print("  exit                           - Cierra la aplicación")
-                
-                elif command == "send":
-                    if len(parts) < 3:
-                        print("❌ Uso: send <MAC_destino> <mensaje>")
-                        continue
-                    
-                    dest_mac = parts[1]
-                    message = ' '.join(parts[2:])
-                    
-                    # Crear cabecera y payload
-                    payload = message.encode('utf-8')
-                    header = protocol.LinkChatHeader.pack(protocol.PacketType.TEXT, len(payload))
-                    
-                    # Enviar trama
-                    print(f"-> Enviando a {dest_mac}...")
-                    adapter.send_frame(dest_mac, header + payload)
-                
-                elif command == "broadcast":
-                    if len(parts) < 2:
-                        print("❌ Uso: broadcast <mensaje>")
-                        continue
-                    
-                    message = ' '.join(parts[1:])
-                    
-                    # Crear cabecera y payload
-                    payload = message.encode('utf-8')
-                    header = protocol.LinkChatHeader.pack(protocol.PacketType.TEXT, len(payload))
-                    
-                    # Enviar trama a la dirección de broadcast
-                    print("-> Enviando a todos (broadcast)...")
-                    adapter.send_frame(config.BROADCAST_MAC, header + payload)
-                
-                elif command == "file":
-                    if len(parts) != 3:
-                        print("❌ Uso: file <MAC_destino> <ruta_archivo>")
-                        continue
-                    dest_mac = parts[1]
-                    filepath = parts[2]
-                    if not os.path.exists(filepath):
-                        print(f"❌ Error: El archivo '{filepath}' no existe.")
-                        continue
-                    # Iniciar transferencia de archivo (se ejecuta en segundo plano)
-                    thread = threading.Thread(target=packet_handler.send_file, args=(adapter, dest_mac, filepath))
-                    thread.start()
+                packet_handler.handle_packet(src_mac, payload)
 
-                elif command == "folder":
-                    if len(parts) != 3:
-                        print("❌ Uso: folder <MAC_destino> <ruta_carpeta>")
-                        continue
-                    dest_mac = parts[1]
-                    folder_path = parts[2]
-                    if not os.path.exists(folder_path):
-                        print(f"❌ Error: La ruta '{folder_path}' no existe.")
+        # Bucle basado en selectors: espera A LA VEZ la entrada del
+        # usuario (una línea completa) y la tubería de recepción, en vez
+        # de quedarse bloqueado en input() mientras llegan paquetes
+        selector = selectors.DefaultSelector()
+        selector.register(sys.stdin, selectors.EVENT_READ)
+        selector.register(rx_wakeup_r, selectors.EVENT_READ)
+
+        running = True
+        prompt_pending = True
+
+        while running:
+            try:
+                if prompt_pending:
+                    sys.stdout.write(f"[{username}]> ")
+                    sys.stdout.flush()
+                    prompt_pending = False
+
+                for key, _ in selector.select():
+                    if key.fileobj is not sys.stdin:
+                        # Paquetes recibidos: procesarlos por lotes
+                        _drain_rx()
                         continue
-                    if not os.path.isdir(folder_path):
-                        print(f"❌ Error: '{folder_path}' no es una carpeta.")
+
+                    # Línea de comando completa disponible
+                    user_input = sys.stdin.readline()
+                    if not user_input:
+                        # EOF en stdin (Ctrl+D o entrada redirigida agotada)
+                        running = False
+                        break
+
+                    prompt_pending = True
+                    user_input = user_input.strip()
+                    if not user_input:
                         continue
-                    # Iniciar transferencia de carpeta (en segundo plano)
-                    thread = threading.Thread(target=packet_handler.send_folder, args=(adapter, dest_mac, folder_path))
-                    thread.start()
-                
-                elif command == "discover":
-                    # Crear cabecera (sin payload)
-                    header = protocol.LinkChatHeader.pack(protocol.PacketType.DISCOVERY_REQUEST, 0)
-                    
-                    # Enviar trama de descubrimiento a broadcast
-                    print("-> Buscando otros usuarios en la red...")
-                    adapter.send_frame(config.BROADCAST_MAC, header)
-                
-                else:
-                    print(f"❌ Comando '{command}' no reconocido. Escribe 'help' para ayuda.")
-            
+
+                    parts = user_input.split()
+                    command = parts[0].lower()
+
+                    # 'exit' rompe el bucle, el resto se despacha por tabla
+                    if command == "exit":
+                        running = False
+                        break
+
+                    handler = cmd_table.get(command)
+                    if handler is not None:
+                        handler(parts)
+                    else:
+                        print(f"❌ Comando '{command}' no reconocido. Escribe 'help' para ayuda.")
+
             except KeyboardInterrupt:
                 # Capturar Ctrl+C en el bucle de comandos para salir limpiamente
                 print("\nDetectado Ctrl+C. Saliendo...")
                 break
-            
+
             except Exception as e:
                 # Capturar otros errores inesperados en el bucle
                 print(f"🔥 Error inesperado en el bucle de comandos: {e}")
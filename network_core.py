@@ -3,6 +3,11 @@ Núcleo de red para Link-Chat
 Manejo de sockets crudos (raw sockets) en Capa 2 (Enlace de Datos)
 """
 
+import atexit
+import ctypes
+import os
+import queue
+import selectors
 import socket
 import struct
 import threading
@@ -11,6 +16,194 @@ import config
 import utils
 
 
+# ============================================================
+# Envío por lotes con sendmmsg(2)
+# ============================================================
+# sendmmsg permite entregar N tramas al kernel en UNA sola llamada al
+# sistema, en lugar de una llamada send() por trama. El coste de entrada
+# al kernel se amortiza entre todo el lote: para transferencias de
+# archivos con miles de fragmentos la reducción de syscalls es enorme.
+#
+# Python no expone sendmmsg, así que se invoca directamente desde libc
+# con ctypes. Si libc no está disponible (sistemas no-glibc), se degrada
+# a un bucle de send() individuales.
+
+class _Iovec(ctypes.Structure):
+    """struct iovec de <sys/uio.h>: un bloque de memoria a enviar."""
+    _fields_ = [
+        ('iov_base', ctypes.c_void_p),
+        ('iov_len', ctypes.c_size_t),
+    ]
+
+
+class _Msghdr(ctypes.Structure):
+    """struct msghdr de <sys/socket.h> (solo los campos que usamos)."""
+    _fields_ = [
+        ('msg_name', ctypes.c_void_p),
+        ('msg_namelen', ctypes.c_uint),
+        ('msg_iov', ctypes.POINTER(_Iovec)),
+        ('msg_iovlen', ctypes.c_size_t),
+        ('msg_control', ctypes.c_void_p),
+        ('msg_controllen', ctypes.c_size_t),
+        ('msg_flags', ctypes.c_int),
+    ]
+
+
+class _Mmsghdr(ctypes.Structure):
+    """struct mmsghdr de <sys/socket.h>: msghdr + bytes enviados."""
+    _fields_ = [
+        ('msg_hdr', _Msghdr),
+        ('msg_len', ctypes.c_uint),
+    ]
+
+
+try:
+    _libc = ctypes.CDLL('libc.so.6', use_errno=True)
+    _sendmmsg = _libc.sendmmsg
+    _sendmmsg.argtypes = [ctypes.c_int, ctypes.POINTER(_Mmsghdr),
+                          ctypes.c_uint, ctypes.c_int]
+    _sendmmsg.restype = ctypes.c_int
+except (OSError, AttributeError):
+    _sendmmsg = None
+
+# recvmmsg(2): contrapartida de recepción de sendmmsg. Drena hasta N
+# tramas del socket en UNA syscall; con MSG_WAITFORONE bloquea solo
+# hasta la primera trama y devuelve las que ya estén encoladas.
+try:
+    _recvmmsg = _libc.recvmmsg
+    _recvmmsg.argtypes = [ctypes.c_int, ctypes.POINTER(_Mmsghdr),
+                          ctypes.c_uint, ctypes.c_int, ctypes.c_void_p]
+    _recvmmsg.restype = ctypes.c_int
+except (NameError, AttributeError):
+    _recvmmsg = None
+
+# Flag de recvmmsg (<sys/socket.h>): esperar solo la primera trama
+_MSG_WAITFORONE = 0x10000
+
+# Tamaño máximo de lote por llamada: el mismo límite práctico que usan
+# las herramientas de inyección de paquetes
+MAX_BATCH = 64
+
+# Formato de la cabecera Ethernet precompilado una sola vez:
+# 6s (MAC destino) + 6s (MAC origen) + H (EtherType), big-endian.
+# struct.Struct evita re-parsear la cadena de formato en cada trama
+# enviada o recibida (struct.pack/unpack la cachean, pero el objeto
+# precompilado se salta incluso esa búsqueda en el caché).
+_ETH_HEADER = struct.Struct('!6s6sH')
+
+# Trama Ethernet mínima (sin FCS): los payloads cortos se rellenan con
+# ceros hasta este tamaño antes de enviar
+_MIN_FRAME_SIZE = 60
+
+# Trama Ethernet máxima estándar: cabecera (14) + MTU (1500)
+_MAX_FRAME_SIZE = 1514
+
+# Tamaño de búfer de recepción: cabecera Ethernet (14) + cabecera
+# Link-Chat (3) + payload máximo representable en 16 bits (65535), de
+# modo que ninguna trama válida se trunca aunque el enlace use jumbo frames
+_RX_BUF_SIZE = 65552
+
+# Ceros precalculados para el relleno de tramas cortas
+_PAD_ZEROS = bytes(_MIN_FRAME_SIZE)
+
+# Búfer de transmisión por hilo: la trama se construye siempre en el
+# mismo bytearray reutilizado (cabecera + payload + relleno) en lugar de
+# concatenar bytes nuevos por envío. threading.local da a cada hilo
+# emisor (CLI, transferencias en segundo plano) su propio búfer sin
+# necesidad de bloqueos.
+_TX_LOCAL = threading.local()
+
+
+def _get_tx_buffer():
+    """Devuelve la memoryview del búfer de transmisión del hilo actual."""
+    mv = getattr(_TX_LOCAL, 'mv', None)
+    if mv is None:
+        _TX_LOCAL.buf = bytearray(_MAX_FRAME_SIZE)
+        mv = _TX_LOCAL.mv = memoryview(_TX_LOCAL.buf)
+    return mv
+
+# Nivel de opciones SOL_PACKET (<linux/socket.h>): no todas las
+# versiones del módulo socket lo exponen, así que se define con fallback
+SOL_PACKET = getattr(socket, 'SOL_PACKET', 263)
+
+# Opción de socket PACKET_QDISC_BYPASS (Linux >= 3.14, <linux/if_packet.h>):
+# el módulo socket de Python no la expone, así que se define aquí.
+# Con valor 1, las tramas salientes van directamente al driver de la
+# interfaz, saltándose la capa de colas de tráfico (qdisc) del kernel.
+PACKET_QDISC_BYPASS = 20
+
+# Opciones SOL_SOCKET no expuestas por todas las versiones del módulo
+# socket (<asm-generic/socket.h>):
+# - SO_BUSY_POLL: microsegundos de sondeo activo en el driver antes de
+#   dormir el hilo; evita el camino interrupción -> planificador -> despertar
+# - SO_INCOMING_CPU: CPU en la que el kernel entregó el último paquete
+SO_BUSY_POLL = getattr(socket, 'SO_BUSY_POLL', 46)
+SO_INCOMING_CPU = getattr(socket, 'SO_INCOMING_CPU', 49)
+
+# PACKET_FANOUT (<linux/if_packet.h>): reparte la recepción entre varios
+# sockets AF_PACKET del mismo grupo a nivel de kernel. El modo HASH
+# mantiene cada flujo (misma pareja de MACs) en el mismo socket, lo que
+# preserva el orden de los fragmentos de una transferencia.
+PACKET_FANOUT = 18
+PACKET_FANOUT_HASH = 0
+PACKET_FANOUT_CPU = 1
+
+
+def send_frames_batch(sock, frames):
+    """
+    Envía una lista de tramas ya construidas en lotes vía sendmmsg(2).
+
+    Args:
+        sock: Socket AF_PACKET ya vinculado a una interfaz
+        frames: Secuencia de objetos bytes/bytearray/memoryview (tramas
+                Ethernet completas, con cabecera incluida)
+
+    Returns:
+        int: Número de tramas efectivamente enviadas
+    """
+    if _sendmmsg is None:
+        # Sin sendmmsg disponible: degradar a un send() por trama
+        for frame in frames:
+            sock.send(frame)
+        return len(frames)
+
+    fd = sock.fileno()
+    total_sent = 0
+
+    for start in range(0, len(frames), MAX_BATCH):
+        batch = frames[start:start + MAX_BATCH]
+        n = len(batch)
+
+        # Copias en memoria de C: garantizan que los punteros iov_base
+        # sigan siendo válidos durante toda la llamada
+        c_bufs = [(ctypes.c_char * len(f)).from_buffer_copy(f) for f in batch]
+        iovecs = (_Iovec * n)()
+        msgs = (_Mmsghdr * n)()
+
+        for i in range(n):
+            iovecs[i].iov_base = ctypes.cast(c_bufs[i], ctypes.c_void_p)
+            iovecs[i].iov_len = len(c_bufs[i])
+            msgs[i].msg_hdr.msg_iov = ctypes.pointer(iovecs[i])
+            msgs[i].msg_hdr.msg_iovlen = 1
+
+        sent = _sendmmsg(fd, msgs, n, 0)
+        if sent < 0:
+            # La llamada falló por completo: reintentar este lote con
+            # send() individuales para no perder tramas silenciosamente
+            for frame in batch:
+                sock.send(frame)
+            total_sent += n
+        else:
+            total_sent += sent
+            if sent < n:
+                # Envío parcial: completar el resto del lote una a una
+                for frame in batch[sent:]:
+                    sock.send(frame)
+                total_sent += n - sent
+
+    return total_sent
+
+
 class NetworkAdapter:
     """
     Adaptador de red para comunicación en Capa 2 usando sockets crudos.
@@ -25,18 +218,32 @@ class NetworkAdapter:
         src_mac (str): Dirección MAC de origen de esta máquina
     """
     
-    def __init__(self, interface_name: str):
+    def __init__(self, interface_name: str, use_dgram: bool = False,
+                 fanout_group: int = None):
         """
         Inicializa el adaptador de red con la interfaz especificada.
-        
+
         Args:
             interface_name (str): Nombre de la interfaz de red a utilizar
                                  (ej: 'eth0', 'enp0s3', 'wlan0')
-        
+            use_dgram (bool): Si es True, usa AF_PACKET + SOCK_DGRAM: el
+                             kernel construye y quita la cabecera Ethernet
+                             (14 bytes) a partir de sockaddr_ll, ahorrando
+                             el struct.pack por trama en Python y el
+                             relleno de tramas cortas. Por defecto False
+                             (SOCK_RAW, cabecera construida a mano).
+            fanout_group (int): Identificador de grupo PACKET_FANOUT
+                             (0-65535), o None para no usar fanout. Varios
+                             adaptadores sobre la misma interfaz con el
+                             mismo grupo se reparten la recepción en el
+                             kernel; el modo HASH dirige cada flujo
+                             siempre al mismo socket, preservando el
+                             orden de los fragmentos por emisor.
+
         Raises:
             OSError: Si no se puede crear el socket o hacer bind a la interfaz
                     (puede requerir privilegios de root/sudo)
-        
+
         Example:
             >>> adapter = NetworkAdapter('eth0')
             >>> print(adapter.interface_name)
@@ -44,15 +251,17 @@ class NetworkAdapter:
         """
         # Almacenar el nombre de la interfaz de red
         self.interface_name = interface_name
-        
+        self.use_dgram = use_dgram
+
         # Crear un socket crudo (raw socket) en Capa 2
         # AF_PACKET: Permite acceso directo a la capa de enlace de datos
         # SOCK_RAW: Socket crudo que incluye la cabecera de la capa de enlace
+        # SOCK_DGRAM: El kernel gestiona la cabecera de la capa de enlace
         # socket.htons(): Convierte el EtherType a network byte order (big-endian)
         # ETHTYPE_CUSTOM: Nuestro EtherType personalizado (0x1234) para identificar paquetes
         self.socket = socket.socket(
             socket.AF_PACKET,
-            socket.SOCK_RAW,
+            socket.SOCK_DGRAM if use_dgram else socket.SOCK_RAW,
             socket.htons(config.ETHTYPE_CUSTOM)
         )
         
@@ -60,10 +269,110 @@ class NetworkAdapter:
         # El formato es (interface_name, protocol)
         # protocol=0 significa que escuchamos todos los protocolos en esta interfaz
         self.socket.bind((interface_name, 0))
+
+        # Ampliar los búferes del socket en el kernel: con los ~208 KB por
+        # defecto, una ráfaga de fragmentos de archivo puede descartarse
+        # antes de que Python llegue a leerla. El kernel recorta el valor
+        # efectivo a net.core.rmem_max / net.core.wmem_max; para aprovechar
+        # el máximo en enlaces rápidos:
+        #   sudo sysctl -w net.core.rmem_max=12582912
+        #   sudo sysctl -w net.core.wmem_max=12582912
+        #   sudo sysctl -w net.core.netdev_max_backlog=5000
+        for buf_opt in (socket.SO_RCVBUF, socket.SO_SNDBUF):
+            try:
+                self.socket.setsockopt(socket.SOL_SOCKET, buf_opt, 12 * 1024 * 1024)
+            except OSError:
+                # No crítico: se mantiene el tamaño por defecto del sistema
+                pass
+
+        # SO_BINDTODEVICE refuerza el bind: asegura que ninguna trama
+        # entre ni salga por otra interfaz distinta de la elegida
+        try:
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_BINDTODEVICE,
+                                   interface_name.encode())
+        except OSError:
+            pass
+
+        # Saltar la capa de colas del kernel en el envío: una etapa menos
+        # de encolado por trama (no disponible en kernels antiguos)
+        try:
+            self.socket.setsockopt(SOL_PACKET, PACKET_QDISC_BYPASS, 1)
+        except OSError:
+            pass
+
+        # Unirse al grupo de fanout si se solicitó: el kernel balancea
+        # las tramas entrantes entre todos los sockets del grupo
+        if fanout_group is not None:
+            fanout_arg = (fanout_group & 0xFFFF) | (PACKET_FANOUT_HASH << 16)
+            self.socket.setsockopt(SOL_PACKET, PACKET_FANOUT, fanout_arg)
+
+        # Sondeo activo en recepción: antes de dormir el hilo, el kernel
+        # consulta el driver durante 50 µs por si llega algo, evitando la
+        # latencia del ciclo interrupción -> despertar en ping-pong de
+        # mensajes cortos (best effort; requiere soporte del driver)
+        try:
+            self.socket.setsockopt(socket.SOL_SOCKET, SO_BUSY_POLL, 50)
+        except OSError:
+            pass
         
         # Obtener y almacenar la dirección MAC de origen de esta máquina
         # Se usará como dirección MAC de origen en todas las tramas enviadas
         self.src_mac = utils.get_mac_address(self.interface_name)
+
+        # MTU de la interfaz: permite a las capas superiores dimensionar
+        # los fragmentos al máximo que admite el enlace (None si no se
+        # pudo determinar; se usará entonces config.CHUNK_SIZE)
+        self.mtu = utils.get_interface_mtu(self.interface_name)
+
+        # Caché de cabeceras Ethernet por MAC de destino. La cabecera de
+        # 14 bytes (destino + origen + EtherType) es idéntica para todas las
+        # tramas hacia un mismo destino; construirla una sola vez evita
+        # re-parsear ambas MAC y re-empaquetar el struct en cada fragmento
+        # de una transferencia de archivo.
+        self._eth_header_cache = {}
+
+        # En modo DGRAM se cachea la sockaddr_ll por destino: el kernel
+        # construye la cabecera Ethernet a partir de esta tupla
+        self._sockaddr_cache = {}
+
+        # Estado de recepción por lotes con recvmmsg (búferes e
+        # iovecs preasignados); se construye perezosamente en la
+        # primera llamada a receive_frames()
+        self._rx_batch = None
+
+        # Búfer persistente para la recepción individual: recvfrom(n)
+        # asigna y descarta un objeto bytes de n bytes por paquete;
+        # recvfrom_into lo rellena en su sitio. Solo un hilo recibe de
+        # cada adaptador (el de captura), así que no necesita ser local
+        # al hilo como el búfer de transmisión.
+        self._recv_buf = bytearray(_RX_BUF_SIZE)
+        self._recv_mv = memoryview(self._recv_buf)
+
+        # Entrega local directa: cuando hay un listener activo,
+        # start_listener_thread registra aquí el put de su cola de
+        # recepción. Las tramas dirigidas a la propia MAC (pruebas de
+        # loopback, envíos a uno mismo) se encolan entonces en proceso,
+        # sin el viaje de ida y vuelta por el kernel y el driver
+        self._local_delivery = None
+
+        # Descriptor del socket cacheado: el camino de envío estándar usa
+        # os.write sobre el fd directamente, evitando el envoltorio de
+        # socket.send (bloqueo interno + varios accesos a atributos por
+        # llamada). En un socket de datagramas cada write es una trama.
+        self._fd = self.socket.fileno()
+
+        # Cerrar el socket de forma ordenada al terminar el programa
+        # (libera el descriptor aunque el hilo listener siga bloqueado)
+        atexit.register(self.close)
+
+    def close(self):
+        """
+        Cierra el socket del adaptador. Es seguro llamarlo varias veces.
+        """
+        try:
+            self.socket.close()
+        except OSError:
+            pass
     
     def send_frame(self, dest_mac_str: str, payload: bytes):
         """
@@ -84,32 +393,117 @@ class NetworkAdapter:
             >>> adapter = NetworkAdapter('eth0')
             >>> adapter.send_frame('ff:ff:ff:ff:ff:ff', b'Hello, Network!')
         """
-        # Convertir dirección MAC de destino de string a bytes
-        # Formato: 'aa:bb:cc:dd:ee:ff' -> b'\xaa\xbb\xcc\xdd\xee\xff'
-        dest_mac_bytes = bytes.fromhex(dest_mac_str.replace(':', ''))
-        
-        # Convertir dirección MAC de origen de string a bytes
-        src_mac_bytes = bytes.fromhex(self.src_mac.replace(':', ''))
-        
-        # Construir la cabecera Ethernet (14 bytes total)
-        # Formato: !6s6sH
-        # ! = Network byte order (big-endian)
-        # 6s = Secuencia de 6 bytes (MAC destino)
-        # 6s = Secuencia de 6 bytes (MAC origen)
-        # H = Unsigned short de 2 bytes (EtherType)
-        ethernet_header = struct.pack(
-            '!6s6sH',
-            dest_mac_bytes,
-            src_mac_bytes,
-            config.ETHTYPE_CUSTOM
-        )
-        
-        # Construir la trama completa concatenando header + payload
-        frame = ethernet_header + payload
-        
-        # Enviar la trama a través del socket crudo
-        self.socket.send(frame)
+        if dest_mac_str == self.src_mac and self._local_delivery is not None:
+            # Autoenvío: entregar directamente a la cola del listener,
+            # sin serializar la cabecera Ethernet ni pasar por el kernel
+            self._local_delivery((self.src_mac, bytes(payload)))
+            return
+
+        if self.use_dgram:
+            # Modo DGRAM: el kernel antepone la cabecera Ethernet a partir
+            # de la sockaddr_ll; solo se envía el payload
+            sockaddr = self._sockaddr_cache.get(dest_mac_str)
+            if sockaddr is None:
+                sockaddr = (self.interface_name, config.ETHTYPE_CUSTOM, 0, 0,
+                            utils.mac_str_to_bytes(dest_mac_str))
+                self._sockaddr_cache[dest_mac_str] = sockaddr
+            self.socket.sendto(payload, sockaddr)
+            return
+
+        # Buscar la cabecera Ethernet precalculada para este destino
+        ethernet_header = self._eth_header_cache.get(dest_mac_str)
+
+        if ethernet_header is None:
+            # Primera trama hacia este destino: construir la cabecera y
+            # cachearla (formato precompilado _ETH_HEADER: !6s6sH)
+            ethernet_header = _ETH_HEADER.pack(
+                utils.mac_str_to_bytes(dest_mac_str),
+                utils.mac_str_to_bytes(self.src_mac),
+                config.ETHTYPE_CUSTOM
+            )
+            self._eth_header_cache[dest_mac_str] = ethernet_header
+
+        header_size = _ETH_HEADER.size
+        frame_len = header_size + len(payload)
+
+        if frame_len > _MAX_FRAME_SIZE:
+            # Payload fuera de lo normal (p.ej. jumbo frames en interfaces
+            # con MTU grande): sendmsg(2) hace el gather de cabecera y
+            # payload directamente en el kernel, sin concatenar en espacio
+            # de usuario una trama de decenas de KB por envío
+            self.socket.sendmsg((ethernet_header, payload))
+            return
+
+        # Construir la trama en el búfer reutilizable del hilo: cabecera,
+        # payload y relleno se escriben por asignación de cortes, sin
+        # asignar un objeto bytes nuevo por envío
+        frame_mv = _get_tx_buffer()
+        frame_mv[:header_size] = ethernet_header
+        frame_mv[header_size:frame_len] = payload
+
+        # Rellenar con ceros hasta la trama mínima de 60 bytes (y borrar
+        # restos del envío anterior que quedarían en el relleno)
+        if frame_len < _MIN_FRAME_SIZE:
+            frame_mv[frame_len:_MIN_FRAME_SIZE] = _PAD_ZEROS[frame_len:]
+            frame_len = _MIN_FRAME_SIZE
+
+        # Enviar la trama escribiendo directamente en el descriptor
+        os.write(self._fd, frame_mv[:frame_len])
     
+    def send_frames_batch(self, dest_mac_str: str, payloads):
+        """
+        Envía varios payloads al mismo destino con una syscall por lote.
+
+        Es el equivalente por lotes de send_frame: la cabecera Ethernet
+        (cacheada por destino) se antepone a cada payload y las tramas
+        resultantes se entregan al kernel vía sendmmsg(2), amortizando el
+        coste de entrada al kernel entre todo el lote. Pensado para el
+        bucle de fragmentos de una transferencia de archivo.
+
+        Args:
+            dest_mac_str (str): Dirección MAC destino 'xx:xx:xx:xx:xx:xx'
+            payloads: Secuencia de payloads (bytes/bytearray/memoryview)
+
+        Returns:
+            int: Número de tramas enviadas
+        """
+        if dest_mac_str == self.src_mac and self._local_delivery is not None:
+            # Autoenvío: entregar el lote directamente a la cola del
+            # listener (copiando cada payload, porque los búferes del
+            # lote se reutilizan en la siguiente iteración)
+            put = self._local_delivery
+            for payload in payloads:
+                put((self.src_mac, bytes(payload)))
+            return len(payloads)
+
+        if self.use_dgram:
+            # En modo DGRAM cada sendto lleva su sockaddr_ll; sendmmsg con
+            # msg_name por mensaje no aporta aquí lo suficiente para
+            # justificar la complejidad: bucle simple
+            sockaddr = self._sockaddr_cache.get(dest_mac_str)
+            if sockaddr is None:
+                sockaddr = (self.interface_name, config.ETHTYPE_CUSTOM, 0, 0,
+                            utils.mac_str_to_bytes(dest_mac_str))
+                self._sockaddr_cache[dest_mac_str] = sockaddr
+            for payload in payloads:
+                self.socket.sendto(payload, sockaddr)
+            return len(payloads)
+
+        ethernet_header = self._eth_header_cache.get(dest_mac_str)
+        if ethernet_header is None:
+            ethernet_header = _ETH_HEADER.pack(
+                utils.mac_str_to_bytes(dest_mac_str),
+                utils.mac_str_to_bytes(self.src_mac),
+                config.ETHTYPE_CUSTOM
+            )
+            self._eth_header_cache[dest_mac_str] = ethernet_header
+
+        # b''.join acepta cualquier objeto búfer (bytes, bytearray,
+        # memoryview), así que los payloads pueden llegar como vistas
+        # sin copia previa
+        frames = [b''.join((ethernet_header, payload)) for payload in payloads]
+        return send_frames_batch(self.socket, frames)
+
     def receive_frame(self):
         """
         Recibe una trama Ethernet desde el socket crudo.
@@ -128,41 +522,120 @@ class NetworkAdapter:
             >>> src, dest, data = adapter.receive_frame()
             >>> print(f"From: {src}, To: {dest}, Data: {data}")
         """
-        # Recibir datos del socket crudo
-        # recvfrom(65535) recibe hasta 65535 bytes (tamaño máximo razonable para una trama)
-        # Retorna tupla: (packet, address)
-        # - packet: bytes con la trama completa (header Ethernet + payload)
-        # - address: información de la dirección (no la usamos aquí)
-        packet, address = self.socket.recvfrom(65535)
+        # Recibir datos del socket crudo sobre el búfer persistente
+        # (dimensionado para admitir jumbo frames), sin asignar un
+        # objeto bytes del tamaño del búfer por paquete.
+        # Retorna tupla: (nbytes, address)
+        # - nbytes: longitud de la trama recibida
+        # - address: información de la dirección (sockaddr_ll)
+        nbytes, address = self.socket.recvfrom_into(self._recv_buf)
+
+        if self.use_dgram:
+            # Modo DGRAM: el kernel ya quitó la cabecera Ethernet; el
+            # paquete ES el payload y la MAC de origen viene en la
+            # sockaddr_ll (campo 5). La MAC destino no se entrega: se
+            # deduce del tipo de paquete (broadcast o dirigido a nosotros).
+            src_mac_str = ':'.join(f'{b:02x}' for b in address[4])
+            if address[2] == socket.PACKET_BROADCAST:
+                dest_mac_str = config.BROADCAST_MAC
+            else:
+                dest_mac_str = self.src_mac
+            return src_mac_str, dest_mac_str, bytes(self._recv_mv[:nbytes])
         
         # Tamaño de la cabecera Ethernet: 14 bytes
         # - 6 bytes: MAC destino
         # - 6 bytes: MAC origen
         # - 2 bytes: EtherType
-        ethernet_header_size = 14
-        
-        # Extraer la cabecera Ethernet de los primeros 14 bytes
-        ethernet_header = packet[:ethernet_header_size]
-        
-        # Desempaquetar la cabecera Ethernet
-        # Formato: !6s6sH (igual que en send_frame)
-        dest_mac_bytes, src_mac_bytes, ethertype = struct.unpack(
-            '!6s6sH',
-            ethernet_header
-        )
-        
+        ethernet_header_size = _ETH_HEADER.size
+
+        # Desempaquetar la cabecera Ethernet directamente desde el búfer
+        # con el formato precompilado: unpack_from lee in situ, sin
+        # corte intermedio
+        dest_mac_bytes, src_mac_bytes, ethertype = _ETH_HEADER.unpack_from(self._recv_buf, 0)
+
         # Convertir las direcciones MAC de bytes a formato string 'xx:xx:xx:xx:xx:xx'
-        # bytes.hex() convierte bytes a hexadecimal: b'\xaa\xbb' -> 'aabb'
-        # Luego insertamos ':' cada 2 caracteres
-        src_mac_str = ':'.join(src_mac_bytes.hex()[i:i+2] for i in range(0, 12, 2))
-        dest_mac_str = ':'.join(dest_mac_bytes.hex()[i:i+2] for i in range(0, 12, 2))
-        
-        # Extraer el payload (todo después de la cabecera Ethernet)
-        payload = packet[ethernet_header_size:]
-        
+        # bytes.hex(':') produce directamente la forma con separadores en
+        # una sola llamada en C, sin cadena hexadecimal intermedia ni
+        # bucle de cortes de 2 caracteres
+        src_mac_str = src_mac_bytes.hex(':')
+        dest_mac_str = dest_mac_bytes.hex(':')
+
+        # Extraer el payload (todo después de la cabecera Ethernet),
+        # copiándolo fuera del búfer antes de que la siguiente recepción
+        # lo sobrescriba
+        payload = bytes(self._recv_mv[ethernet_header_size:nbytes])
+
         # Retornar tupla con MAC origen, MAC destino y payload
         return src_mac_str, dest_mac_str, payload
 
+    def receive_frames(self):
+        """
+        Recibe un lote de tramas con una sola llamada al sistema.
+
+        Usa recvmmsg(2) con MSG_WAITFORONE: bloquea hasta la primera
+        trama y devuelve además todas las que ya estuvieran encoladas en
+        el socket (hasta MAX_BATCH), amortizando el coste de la syscall
+        entre todo el lote cuando el emisor envía ráfagas. Si recvmmsg
+        no está disponible (o en modo DGRAM, donde la MAC de origen
+        viene en la sockaddr_ll y no en la trama), degrada a una
+        recepción individual.
+
+        A diferencia de receive_frame, NO devuelve la MAC destino: los
+        consumidores (el despachador de paquetes) solo usan la de
+        origen, y formatear la de destino sería trabajo por trama que
+        nadie lee. Para inspeccionar ambas MACs está receive_frame.
+
+        Returns:
+            list: Lista de tuplas (src_mac, payload), con al menos un
+                  elemento
+        """
+        if self.use_dgram or _recvmmsg is None:
+            src_mac, _dest_mac, payload = self.receive_frame()
+            return [(src_mac, payload)]
+
+        if self._rx_batch is None:
+            # Preasignar búferes, iovecs y mmsghdrs una sola vez; las
+            # llamadas siguientes solo rellenan los búferes existentes
+            bufs = [(ctypes.c_char * _RX_BUF_SIZE)() for _ in range(MAX_BATCH)]
+            iovecs = (_Iovec * MAX_BATCH)()
+            hdrs = (_Mmsghdr * MAX_BATCH)()
+            for i in range(MAX_BATCH):
+                iovecs[i].iov_base = ctypes.cast(bufs[i], ctypes.c_void_p)
+                iovecs[i].iov_len = _RX_BUF_SIZE
+                hdrs[i].msg_hdr.msg_iov = ctypes.pointer(iovecs[i])
+                hdrs[i].msg_hdr.msg_iovlen = 1
+            self._rx_batch = (bufs, iovecs, hdrs)
+
+        bufs, _iovecs, hdrs = self._rx_batch
+        n_received = _recvmmsg(self.socket.fileno(), hdrs, MAX_BATCH,
+                               _MSG_WAITFORONE, None)
+        if n_received <= 0:
+            # Error de recvmmsg (p.ej. interrupción por señal): dejar
+            # que el camino individual gestione la condición
+            src_mac, _dest_mac, payload = self.receive_frame()
+            return [(src_mac, payload)]
+
+        header_size = _ETH_HEADER.size
+        frames = []
+        for i in range(n_received):
+            msg_len = hdrs[i].msg_len
+            if msg_len < header_size:
+                continue
+            buf = bufs[i]
+            # La cabecera se parsea in situ sobre el búfer de recepción
+            # (unpack_from acepta el protocolo búfer de ctypes) y solo el
+            # payload se copia UNA vez fuera del búfer reutilizable: los
+            # payloads cruzan la cola hacia el despachador y el siguiente
+            # lote sobrescribirá estos búferes, así que una memoryview
+            # sin copia no sobreviviría; la copia única es el mínimo.
+            _dest_mac_bytes, src_mac_bytes, _ = _ETH_HEADER.unpack_from(buf, 0)
+            frames.append((src_mac_bytes.hex(':'),
+                           buf[header_size:msg_len]))
+        if not frames:
+            src_mac, _dest_mac, payload = self.receive_frame()
+            return [(src_mac, payload)]
+        return frames
+
 
 def start_listener_thread(adapter: NetworkAdapter, packet_handler_callback):
     """
@@ -179,41 +652,123 @@ def start_listener_thread(adapter: NetworkAdapter, packet_handler_callback):
                                  - payload (bytes): Datos recibidos
     
     Returns:
-        threading.Thread: El hilo creado e iniciado (útil para debugging o join)
-    
+        threading.Thread: El hilo receptor creado e iniciado
+
     Example:
         >>> def handle_packet(src_mac, payload):
         ...     print(f"Recibido de {src_mac}: {payload}")
         >>> adapter = NetworkAdapter('eth0')
         >>> thread = start_listener_thread(adapter, handle_packet)
     """
-    
-    def _listener_loop():
+    reactor = NetworkReactor()
+    reactor.add_adapter(adapter, packet_handler_callback)
+    return reactor.start()
+
+
+class NetworkReactor:
+    """
+    Bucle de recepción multiplexado para uno o varios adaptadores.
+
+    Un único hilo de captura espera en selectors (epoll en Linux) sobre
+    los sockets de todos los adaptadores registrados y drena por lotes
+    el que tenga tramas, de modo que escuchar N interfaces no requiere
+    N hilos bloqueados. Un único hilo despachador consume la cola y
+    ejecuta los callbacks: separar captura y despacho evita que un
+    callback lento (p.ej. escritura a disco de un fragmento) frene la
+    captura y provoque descartes en el búfer del kernel.
+
+    Hay UN solo hilo despachador a propósito: los fragmentos FILE_DATA
+    deben procesarse en el orden en que llegaron; un pool de workers
+    los reordenaría y corrompería los archivos recibidos.
+
+    Example:
+        >>> reactor = NetworkReactor()
+        >>> reactor.add_adapter(adapter_eth, handle_packet)
+        >>> reactor.add_adapter(adapter_wlan, handle_packet)
+        >>> reactor.start()
+    """
+
+    def __init__(self):
+        self._selector = selectors.DefaultSelector()
+        # Cola entre captura y despacho: SimpleQueue está implementada
+        # en C y no necesita bloqueos explícitos
+        self._rx_queue = queue.SimpleQueue()
+        self._capture_thread = None
+
+    def add_adapter(self, adapter: NetworkAdapter, packet_handler_callback):
         """
-        Bucle interno que escucha continuamente tramas entrantes.
-        
-        Este bucle se ejecuta indefinidamente en un hilo separado,
-        recibiendo tramas y procesándolas con el callback.
+        Registra un adaptador y el callback que procesará sus paquetes.
+
+        Args:
+            adapter (NetworkAdapter): Adaptador de red configurado
+            packet_handler_callback: Función que recibe (src_mac, payload)
         """
+        put = self._rx_queue.put
+
+        # Entrega local (autoenvíos) del adaptador: directo a la cola,
+        # etiquetado con su callback, sin pasar por el kernel
+        def _local_delivery(item):
+            put((packet_handler_callback, item[0], item[1]))
+
+        adapter._local_delivery = _local_delivery
+        self._selector.register(adapter.socket, selectors.EVENT_READ,
+                                (adapter, packet_handler_callback))
+
+    def _capture_loop(self):
+        """Espera sockets legibles y encola sus lotes de tramas."""
+        # Tras la primera trama se fija la afinidad del hilo a la CPU en
+        # la que el kernel entrega los paquetes (SO_INCOMING_CPU): el
+        # hilo y los datos comparten caché y se evitan migraciones
+        pinned = False
+        put = self._rx_queue.put
+
         while True:
-            # Recibir una trama desde el adaptador de red
-            # Retorna: (src_mac, dest_mac, payload)
-            src_mac, dest_mac, payload = adapter.receive_frame()
-            
-            # Llamar al callback con la MAC de origen y el payload
+            for key, _events in self._selector.select():
+                adapter, callback = key.data
+
+                # Recibir un lote de tramas del adaptador legible
+                # (una syscall puede devolver hasta MAX_BATCH tramas)
+                frames = adapter.receive_frames()
+
+                if not pinned:
+                    pinned = True
+                    try:
+                        cpu = adapter.socket.getsockopt(socket.SOL_SOCKET,
+                                                        SO_INCOMING_CPU)
+                        if cpu >= 0:
+                            os.sched_setaffinity(0, {cpu})
+                    except (OSError, AttributeError):
+                        # Best effort: sin soporte, se mantiene la
+                        # planificación por defecto
+                        pass
+
+                # Encolar y volver de inmediato a esperar el siguiente lote
+                for src_mac, payload in frames:
+                    put((callback, src_mac, payload))
+
+    def _dispatch_loop(self):
+        """Consume la cola y ejecuta los callbacks, fuera de la captura."""
+        while True:
+            callback, src_mac, payload = self._rx_queue.get()
+
             # El callback es responsable de procesar estos datos
             # (ej: decodificar mensajes, manejar archivos, etc.)
-            packet_handler_callback(src_mac, payload)
-    
-    # Crear un nuevo hilo que ejecutará la función _listener_loop
-    listener_thread = threading.Thread(target=_listener_loop)
-    
-    # Configurar como daemon: el hilo se cerrará automáticamente
-    # cuando el programa principal termine, sin necesidad de join()
-    listener_thread.daemon = True
-    
-    # Iniciar el hilo (comienza a ejecutar _listener_loop)
-    listener_thread.start()
-    
-    # Retornar el hilo creado
-    return listener_thread
+            callback(src_mac, payload)
+
+    def start(self):
+        """
+        Arranca los hilos de captura y despacho (daemon, idempotente).
+
+        Returns:
+            threading.Thread: El hilo de captura (útil para debugging o join)
+        """
+        if self._capture_thread is None:
+            # Hilos daemon: se cierran automáticamente cuando el
+            # programa principal termina
+            self._capture_thread = threading.Thread(
+                target=self._capture_loop, daemon=True)
+            dispatch_thread = threading.Thread(
+                target=self._dispatch_loop, daemon=True)
+            self._capture_thread.start()
+            dispatch_thread.start()
+        return self._capture_thread
@@ -4,13 +4,17 @@ Definición de la estructura de paquetes para comunicación en Capa 2
 """
 
 import struct
-from enum import Enum
+from enum import IntEnum
 
 
-class PacketType(Enum):
+class PacketType(IntEnum):
     """
     Enumeración de tipos de paquetes soportados por el protocolo Link-Chat.
-    
+
+    Es un IntEnum para que el despacho de paquetes entrantes compare el
+    byte de tipo recibido directamente contra los miembros (comparación
+    de enteros en C), sin construir un objeto enum por paquete.
+
     Cada tipo identifica el propósito del paquete en la comunicación:
     - TEXT: Mensaje de texto simple
     - FILE_START: Inicio de transferencia de archivo (contiene metadatos)
@@ -31,6 +35,12 @@ class PacketType(Enum):
     DISCOVERY_RESPONSE = 0x06
 
 
+# Formato de la cabecera precompilado una sola vez a nivel de módulo:
+# struct.Struct evita re-localizar el formato '!BH' en el caché interno
+# de struct en cada paquete empaquetado o desempaquetado
+_HEADER = struct.Struct('!BH')
+
+
 class LinkChatHeader:
     """
     Cabecera del protocolo Link-Chat.
@@ -84,8 +94,29 @@ class LinkChatHeader:
         """
         # Formato: !BH = Big-endian, unsigned char (1 byte), unsigned short (2 bytes)
         # packet_type.value extrae el valor numérico del enum
-        return struct.pack('!BH', packet_type.value, payload_len)
-    
+        return _HEADER.pack(packet_type.value, payload_len)
+
+    @staticmethod
+    def pack_into(buffer, offset: int, packet_type: PacketType, payload_len: int):
+        """
+        Empaqueta la cabecera directamente en un búfer existente.
+
+        Variante de pack() para los caminos calientes que reutilizan
+        búferes de trama: escribe los 3 bytes en su sitio sin asignar un
+        objeto bytes intermedio.
+
+        Args:
+            buffer: Búfer escribible (bytearray/memoryview) de destino
+            offset (int): Posición en el búfer donde escribir la cabecera
+            packet_type (PacketType): Tipo de paquete a enviar
+            payload_len (int): Longitud del payload en bytes (0-65535)
+
+        Example:
+            >>> frame = bytearray(LinkChatHeader.HEADER_SIZE + 100)
+            >>> LinkChatHeader.pack_into(frame, 0, PacketType.TEXT, 100)
+        """
+        _HEADER.pack_into(buffer, offset, packet_type.value, payload_len)
+
     @staticmethod
     def unpack(header_bytes: bytes) -> tuple:
         """
@@ -112,4 +143,4 @@ class LinkChatHeader:
         """
         # Formato: !BH = Big-endian, unsigned char (1 byte), unsigned short (2 bytes)
         # Retorna tupla con (packet_type, payload_len)
-        return struct.unpack('!BH', header_bytes)
+        return _HEADER.unpack(header_bytes)
@@ -3,17 +3,184 @@ Utilidades para Link-Chat
 Funciones auxiliares para operaciones de red en Capa 2
 """
 
+import functools
+import re
 import socket
-import uuid
 
+# Expresión regular precompilada para validar direcciones MAC.
+# Compilarla una sola vez a nivel de módulo evita el coste de re.compile
+# implícito por llamada y es más estricta que comprobar longitud y número
+# de ':' (que aceptaría caracteres no hexadecimales).
+_MAC_RE = re.compile(r'^[0-9a-f]{2}(?::[0-9a-f]{2}){5}$', re.IGNORECASE)
 
+
+def is_valid_mac(mac: str) -> bool:
+    """
+    Valida que una cadena tenga el formato de dirección MAC 'xx:xx:xx:xx:xx:xx'.
+
+    Args:
+        mac (str): Cadena a validar
+
+    Returns:
+        bool: True si es una MAC válida (hexadecimal con separadores ':')
+
+    Example:
+        >>> is_valid_mac('aa:bb:cc:dd:ee:ff')
+        True
+        >>> is_valid_mac('aa:bb:cc:dd:ee:gg')
+        False
+    """
+    return _MAC_RE.match(mac) is not None
+
+# Tabla precalculada par-hexadecimal -> valor de byte, en todas las
+# combinaciones de mayúsculas/minúsculas. Convertir una MAC queda en seis
+# búsquedas de diccionario, sin la cadena temporal que crea
+# `mac.replace(':', '')` ni el re-escaneo de bytes.fromhex en cada llamada.
+_HEX_PAIR_TO_BYTE = {}
+for _value in range(256):
+    _pair = f'{_value:02x}'
+    for _hi in (_pair[0], _pair[0].upper()):
+        for _lo in (_pair[1], _pair[1].upper()):
+            _HEX_PAIR_TO_BYTE[_hi + _lo] = _value
+del _value, _pair, _hi, _lo
+
+
+@functools.lru_cache(maxsize=256)
+def mac_str_to_bytes(mac: str) -> bytes:
+    """
+    Convierte una dirección MAC en formato 'xx:xx:xx:xx:xx:xx' a sus 6 bytes.
+
+    Se usa en el camino caliente de envío, por lo que la conversión se
+    hace con una tabla precalculada en lugar de str.replace +
+    bytes.fromhex, y el resultado se memoriza con lru_cache: en la
+    práctica solo hay un puñado de MACs (la propia, broadcast y los
+    destinos conocidos), así que las llamadas repetidas quedan en una
+    búsqueda de diccionario.
+
+    Args:
+        mac (str): Dirección MAC con separadores ':' (ej: 'aa:bb:cc:dd:ee:ff')
+
+    Returns:
+        bytes: Los 6 bytes de la dirección
+
+    Raises:
+        ValueError: Si la cadena no tiene el formato esperado
+
+    Example:
+        >>> mac_str_to_bytes('ff:ff:ff:ff:ff:ff')
+        b'\\xff\\xff\\xff\\xff\\xff\\xff'
+    """
+    try:
+        table = _HEX_PAIR_TO_BYTE
+        return bytes((table[mac[0:2]], table[mac[3:5]], table[mac[6:8]],
+                      table[mac[9:11]], table[mac[12:14]], table[mac[15:17]]))
+    except KeyError:
+        raise ValueError(f"Dirección MAC inválida: '{mac}'")
+
+
+def read_interface_attr(interface: str, attribute: str):
+    """
+    Lee un atributo de una interfaz desde /sys/class/net/.
+
+    Es la misma información que exponen 'ip link show' o 'ethtool'
+    (operstate, carrier, speed, duplex, address, mtu...), pero con una
+    sola lectura de archivo en lugar de fork + exec + parseo de texto.
+
+    Args:
+        interface (str): Nombre de la interfaz (ej: 'eth0')
+        attribute (str): Nombre del atributo sysfs (ej: 'operstate')
+
+    Returns:
+        str: Contenido del atributo sin espacios, o None si no está disponible
+
+    Example:
+        >>> read_interface_attr('eth0', 'operstate')
+        'up'
+    """
+    try:
+        with open(f'/sys/class/net/{interface}/{attribute}') as f:
+            return f.read().strip()
+    except OSError:
+        # La interfaz o el atributo pueden no existir
+        # (p.ej. 'speed' sin enlace activo)
+        return None
+
+
+def get_interface_mtu(interface: str):
+    """
+    Obtiene el MTU de una interfaz de red.
+
+    Permite usar fragmentos de archivo del tamaño máximo que admite el
+    enlace (p.ej. 9000 en redes con jumbo frames) en lugar del clásico
+    1500. Se lee de sysfs, igual que el resto de atributos de interfaz.
+
+    Args:
+        interface (str): Nombre de la interfaz (ej: 'eth0')
+
+    Returns:
+        int: MTU en bytes, o None si no se pudo determinar
+
+    Example:
+        >>> get_interface_mtu('eth0')
+        1500
+    """
+    mtu = read_interface_attr(interface, 'mtu')
+    try:
+        return int(mtu)
+    except (TypeError, ValueError):
+        return None
+
+
+def load_arp_table(interface: str = None) -> dict:
+    """
+    Carga la tabla ARP/vecinos del sistema de una sola vez.
+
+    Lee /proc/net/arp (la misma tabla que muestran 'arp -n' o
+    'ip neigh') y la devuelve como diccionario, de modo que resolver
+    la MAC de N hosts son N búsquedas O(1) en lugar de N ejecuciones
+    de un proceso externo.
+
+    Args:
+        interface (str): Si se indica, solo se incluyen entradas de esa
+                         interfaz (ej: 'eth0')
+
+    Returns:
+        dict: Mapeo {ip: mac}, excluyendo entradas incompletas
+              (MAC 00:00:00:00:00:00)
+
+    Example:
+        >>> load_arp_table('eth0')
+        {'192.168.1.1': 'a4:2b:b0:c9:12:7f'}
+    """
+    table = {}
+    try:
+        with open('/proc/net/arp') as f:
+            next(f)  # Saltar la línea de cabecera
+            for line in f:
+                parts = line.split()
+                # Columnas: IP, tipo HW, flags, MAC, máscara, dispositivo
+                if len(parts) < 6 or parts[3] == '00:00:00:00:00:00':
+                    continue
+                if interface is not None and parts[5] != interface:
+                    continue
+                table[parts[0]] = parts[3]
+    except OSError:
+        # Sin /proc (o sin permisos): devolver tabla vacía
+        pass
+    return table
+
+
+@functools.lru_cache(maxsize=8)
 def get_mac_address(interface: str) -> str:
     """
     Obtiene la dirección MAC de una interfaz de red específica.
-    
+
     Lee la dirección MAC del sistema de archivos sysfs de Linux, que es el
-    método más fiable para una interfaz concreta.
-    
+    método más fiable para una interfaz concreta. La MAC de una interfaz
+    es estable durante la vida del proceso, así que el resultado se
+    memoriza: las llamadas repetidas (diagnóstico, pruebas) no repiten
+    el open + read + strip.
+
     Args:
         interface (str): Nombre de la interfaz (ej: 'eth0')
         